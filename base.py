@@ -1,3 +1,5 @@
+import contextlib
+import copy
 import logging
 import types
 import typing as tp
@@ -22,6 +24,8 @@ class RenderData:
     key = None
     chained_key: tp.Optional[str] = None
     render_cycle_id: int = 0
+    # the latest render cycle in which this node or any of its descendants was rendered
+    subtree_render_cycle_id: int = 0
 
     def set_key(self, value):
         self.key = value
@@ -46,10 +50,53 @@ class RenderData:
         return self.chained_key
 
 
+class StateField:
+    def __init__(self, default=None):
+        self.default = default
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        r_manager = instance._reactivity_manager
+        if self.name in r_manager._stale_computed:
+            r_manager._update_computed(self.name)
+        r_manager._record_value_read(self.name, False)
+
+        try:
+            return instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name) from None
+
+    def __set__(self, instance, value):
+        instance._reactivity_manager._set_value(self.name, value, False)
+        if instance._context and instance._can_push_notifications:
+            instance._context.event_manager.push_node_modification(instance)
+
+    def get_default(self):
+        if isinstance(self.default, list | dict | set):
+            return copy.copy(self.default)
+        return self.default
+
+
+def state(default=None) -> tp.Any:
+    # declares a reactive field on the component class
+    return StateField(default)
+
+
 class ComponentTreeNode(ABC):
+    # a class declaring its state with state() fields, or created with explicit_state=True, skips the attribute
+    # hooks below: only its state fields record reads and notify about writes, other attributes are plain
+    _explicit_state = False
+    _state_fields: tp.Dict[str, StateField] = {}
+
     _attr_blacklist = {'register_props', 'props', 'context', 'rct',
                        'invalidate', 'set_state', 'emit',
-                       'setup', 'before_mount', 'mounted', 'before_mount', 'render',
+                       'setup', 'before_mount', 'mounted', 'before_mount', 'render', 'should_update',
                        'activated', 'deactivated', 'updated', 'before_unmount', 'unmounted', 'on_event'}
 
     @register_props
@@ -61,6 +108,9 @@ class ComponentTreeNode(ABC):
         self._is_dirty = False
         self._can_push_notifications = False
 
+        for name, state_field in self._state_fields.items():
+            self._reactivity_manager._set_value(name, state_field.get_default(), False)
+
         try:
             states = self.States
             state = list(states.__members__.values())[0]
@@ -68,6 +118,30 @@ class ComponentTreeNode(ABC):
         except Exception:
             object.__setattr__(self, 'state', None)
 
+    def __init_subclass__(cls, explicit_state: bool = None, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        cls._state_fields = {name: value for base in reversed(cls.__mro__)
+                             for name, value in vars(base).items() if isinstance(value, StateField)}
+
+        if explicit_state is None:
+            explicit_state = any(isinstance(value, StateField) for value in vars(cls).values())
+
+        # a component inheriting implicit state from its bases keeps the hooks
+        cls._explicit_state = explicit_state and all(
+            base._explicit_state for base in cls.__bases__
+            if issubclass(base, ComponentTreeNode) and base is not ComponentTreeNode
+        )
+
+        if cls._explicit_state:
+            if '__getattribute__' not in vars(cls):
+                cls.__getattribute__ = object.__getattribute__
+            if '__setattr__' not in vars(cls):
+                cls.__setattr__ = object.__setattr__
+        elif cls.__getattribute__ is object.__getattribute__:
+            cls.__getattribute__ = ComponentTreeNode.__getattribute__
+            cls.__setattr__ = ComponentTreeNode.__setattr__
+
     def register_props(self, props: tp.Mapping[tp.Text, tp.Any]):
         if not hasattr(self, "_props"):
             self._props = {"children": []}
@@ -120,6 +194,8 @@ class ComponentTreeNode(ABC):
         if key[0] != '_' and key not in self._attr_blacklist:
             r_manager = super().__getattribute__('_reactivity_manager')
             if r_manager:
+                if key in r_manager._stale_computed:
+                    value = r_manager._update_computed(key)
                 r_manager._record_value_read(key, False)
 
         return value
@@ -142,9 +218,77 @@ class ComponentTreeNode(ABC):
             self.context.event_manager.push_node_modification(self)
 
     def set_state(self, **kwargs):
-        for k, v in kwargs.items():
-            if hasattr(self, k):
-                self.__setattr__(k, v)
+        with self._context.event_manager.batch() if self._context else contextlib.nullcontext():
+            for k, v in kwargs.items():
+                if hasattr(self, k):
+                    self.__setattr__(k, v)
+
+    def clone(self):
+        """
+        Copies an unrendered prototype, e.g. a start screen shared by all sessions.
+
+        Child nodes in props are cloned, lists, dicts and sets are copied and reactive state is deep-copied.
+        Bound methods and closures of the prototype's nodes, in props, attributes, computed values and watchers,
+        are rebound to the copies. A callable reaching a prototype node any other way, e.g. through a
+        functools.partial or an object it holds, keeps using the prototype: create such screens with a factory.
+        """
+        return self._clone({})
+
+    def _clone(self, clones: tp.Dict[int, 'ComponentTreeNode']):
+        node = object.__new__(type(self))
+        clones[id(self)] = node
+
+        state = object.__getattribute__(self, '__dict__')
+        node_state = object.__getattribute__(node, '__dict__')
+
+        # child nodes first, so callables and attributes referring to them are rebound too
+        props = {key: _clone_prop(value, clones) for key, value in state['_props'].items()}
+
+        for key, value in state.items():
+            if isinstance(value, list | dict | set):
+                value = copy.copy(value)
+            node_state[key] = _rebind(value, clones)
+
+        r_manager = state['_reactivity_manager']
+        reactivity_manager = ReactivityManager(node)
+        for key, value in r_manager._values.items():
+            curr = copy.deepcopy(value.curr)
+            reactivity_manager._values[key] = ReactivityManager.ComponentValue(curr=curr)
+            if key[0] != '$':
+                node_state[key] = curr
+
+        # computed values and watchers registered before cloning are evaluated on the copy's state
+        watched_exprs = {}
+        for key, value in r_manager._values.items():
+            for watched_expr in (value.watched_expr, *value.dep_watchers):
+                if watched_expr is not None and id(watched_expr) not in watched_exprs:
+                    watched_exprs[id(watched_expr)] = ReactivityManager.WatchedExpression(
+                        expr=_rebind(watched_expr.expr, clones),
+                        deps=set(watched_expr.deps),
+                        value=copy.deepcopy(watched_expr.value),
+                        target=watched_expr.target,
+                        callback=_rebind(watched_expr.callback, clones)
+                    )
+
+            if value.watched_expr is not None:
+                watched_expr = watched_exprs[id(value.watched_expr)]
+                reactivity_manager._values[key].watched_expr = watched_expr
+                reactivity_manager._values[key].curr = watched_expr.value
+                if key[0] != '$':
+                    node_state[key] = watched_expr.value
+
+        for watched_expr in watched_exprs.values():
+            reactivity_manager._register_watcher_deps(watched_expr)
+        reactivity_manager._stale_computed = set(r_manager._stale_computed)
+
+        node_state['_render_data'] = RenderData()
+        node_state['_reactivity_manager'] = reactivity_manager
+        node_state['_context'] = None
+        node_state['_is_dirty'] = False
+        node_state['_can_push_notifications'] = False
+        node_state['_props'] = props
+
+        return node
 
     def emit(self, name: str, **kwargs):
         self.context.event_manager.push_custom_event(sender=self, name=name, data=kwargs)
@@ -158,6 +302,10 @@ class ComponentTreeNode(ABC):
     async def mounted(self):
         pass
 
+    def should_update(self, updated_props: tp.Dict[str, tp.Tuple[tp.Any, tp.Any]]) -> bool:
+        # called when the parent re-renders, returning False reuses the previous subtree as-is
+        return True
+
     async def before_update(self):
         pass
 
@@ -184,3 +332,55 @@ class ComponentTreeNode(ABC):
 
     # async def watch_effect(self):
     #     pass
+
+
+_shared_prop_types = {str, int, float, bool, type(None)}
+
+
+def _clone_prop(value, clones: tp.Dict[int, ComponentTreeNode]):
+    value_type = type(value)
+
+    if value_type in _shared_prop_types:
+        return value
+    if value_type is list:
+        return [_clone_prop(item, clones) for item in value]
+    if value_type is tuple:
+        return tuple(_clone_prop(item, clones) for item in value)
+    if value_type is dict:
+        return {key: _clone_prop(item, clones) for key, item in value.items()}
+    if value_type is set:
+        return set(value)
+    if isinstance(value, ComponentTreeNode) and id(value) not in clones:
+        return value._clone(clones)
+    return _rebind(value, clones)
+
+
+def _rebind(value, clones: tp.Dict[int, ComponentTreeNode]):
+    # already cloned prototype nodes, their bound methods and closures over them are replaced with the copies
+    clone = clones.get(id(value))
+    if clone is not None:
+        return clone
+
+    value_type = type(value)
+
+    if value_type is types.MethodType:
+        clone = clones.get(id(value.__self__))
+        if clone is not None:
+            return types.MethodType(value.__func__, clone)
+    elif value_type is types.FunctionType and value.__closure__:
+        closure = []
+        for cell in value.__closure__:
+            try:
+                clone = clones.get(id(cell.cell_contents))
+            except ValueError:
+                # the closure variable is not assigned yet
+                clone = None
+            closure.append(clone is not None and types.CellType(clone) or cell)
+
+        if any(cell is not prev_cell for cell, prev_cell in zip(closure, value.__closure__)):
+            function = types.FunctionType(value.__code__, value.__globals__, value.__name__, value.__defaults__,
+                                          tuple(closure))
+            function.__kwdefaults__ = value.__kwdefaults__
+            return function
+
+    return value
@@ -0,0 +1,91 @@
+"""
+End-to-end scenarios of the built-in components: a started session handles button clicks through
+the event processor, renderer and DOM diff, up to the scheduled screen update.
+
+    python -m rtgbot.benchmarks.bench_components [--json results.json]
+"""
+import itertools
+
+from rtgbot.benchmarks.bench_session_creation import NullMessageSender
+from rtgbot.benchmarks.harness import measure_async, parse_args, report
+from rtgbot.components.base import Window, WindowsGroup
+from rtgbot.components.checkbox import Checkbox
+from rtgbot.components.paginator import Paginator
+from rtgbot.components.select import Select
+from rtgbot.components.widgets import Text
+from rtgbot.components.windows_list_view import WindowsListView
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.user_session import UserSession
+
+
+def paginator():
+    return Window()(Text("paginator"), Paginator(count=50))
+
+
+def select():
+    return Window()(
+        Text("select"),
+        Select(options=[f"option {i}" for i in range(20)])(lambda item, selected: selected and f"[{item}]" or item),
+    )
+
+
+def checkbox():
+    return Window()(
+        Text("checkboxes"),
+        *[Checkbox(key=f"checkbox{i}")(lambda checked: checked and "on" or "off") for i in range(10)],
+    )
+
+
+def windows_list_view():
+    items = [f"item {i}" for i in range(200)]
+
+    async def get_items(start, end):
+        return items[start:end]
+
+    return WindowsGroup()(
+        WindowsListView(items_getter=get_items, item_builder=lambda item, i: Window()(Text(item)),
+                        items_count=len(items), page_size=10, header="items")
+    )
+
+
+# the buttons each scenario keeps pressing, in turn
+SCENARIOS = {
+    "Paginator": (paginator, ("ᐅ", "ᐊ")),
+    "Select": (select, ("option 3", "option 17")),
+    "Checkbox": (checkbox, ("off", "on")),
+    "WindowsListView": (windows_list_view, ("ᐅ", "ᐊ")),
+}
+
+
+def bench_scenario(results, name: str, build_screen, button_texts):
+    session = None
+    buttons = itertools.cycle(button_texts)
+
+    async def setup():
+        nonlocal session
+        session = UserSession(None, UserInfo(1), build_screen(), NullMessageSender())
+        await session.start()
+
+    async def click():
+        text = next(buttons)
+        button_id = next(button_id for button_id, button in session.event_processor.button_elements.items()
+                         if button.text == text)
+
+        session.event_processor.push_button_click(button_id)
+        await session.event_processor.event_queue.join()
+
+    results[f"click[{name}]"] = measure_async(click, number=50, setup=setup)
+
+
+def main():
+    args = parse_args()
+    results = {}
+
+    for name, (build_screen, button_texts) in SCENARIOS.items():
+        bench_scenario(results, name, build_screen, button_texts)
+
+    report("bench_components", results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares message info storage backends on a screen update of a chat with many windows.
+
+    python -m rtgbot.benchmarks.bench_message_info_storage [--json results.json]
+"""
+import asyncio
+
+from rtgbot.benchmarks.harness import measure_async, parse_args, report
+from rtgbot.etities.message_info import TgMessageInfo
+from rtgbot.message_info_storage.indexed_memory_message_info_storage import IndexedMemoryTgMessageInfoStorage
+from rtgbot.message_info_storage.memory_message_info_storage import MemoryTgMessageInfoStorage
+
+CHATS = 100
+WINDOW_COUNTS = (5, 20, 100, 500)
+
+
+def make_storage(storage_cls, windows: int):
+    storage = storage_cls()
+
+    async def fill():
+        for chat_id in range(CHATS):
+            for i in range(windows):
+                await storage.add(chat_id, f"root.{i}", TgMessageInfo(message_id=i + 1, has_media=False))
+
+    asyncio.run(fill())
+    return storage
+
+
+def update_screen(storage, windows: int):
+    # what MessageSender._update_message does for every kept message
+    async def run():
+        chat_id = CHATS // 2
+        for i in range(windows):
+            message_info = await storage.get(chat_id, f"root.{i}")
+            await storage.remove(chat_id, message_info.message_id)
+            await storage.add(chat_id, f"root.{i}", message_info)
+
+    return run
+
+
+def main():
+    args = parse_args()
+    results = {}
+
+    for windows in WINDOW_COUNTS:
+        for storage_cls in (MemoryTgMessageInfoStorage, IndexedMemoryTgMessageInfoStorage):
+            storage = make_storage(storage_cls, windows)
+            number = max(1, 2000 // windows)
+            results[f"{storage_cls.__name__}[windows={windows}]"] = \
+                measure_async(update_screen(storage, windows), number=number)
+
+    report("message_info_storage", results, args.json)
+
+
+if __name__ == "__main__":
+    main()
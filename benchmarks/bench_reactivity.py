@@ -0,0 +1,114 @@
+"""
+Reactivity hot paths: state writes through ReactivityManager._set_value with and without dependent
+computed values and watchers, lazily evaluated computed values, and attribute reads through ComponentTreeNode.__getattribute__,
+compared with components declaring their state with state() fields.
+
+    python -m rtgbot.benchmarks.bench_reactivity [--json results.json]
+"""
+from rtgbot.base import state
+from rtgbot.benchmarks.harness import measure, parse_args, report
+from rtgbot.components.base import Component
+
+NUMBER = 20000
+
+
+class Node(Component):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.count = 0
+
+
+class ExplicitNode(Component):
+    count = state(0)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.other = 0
+
+
+class Plain:
+    def __init__(self):
+        self.count = 0
+
+
+def bench_set_value(results):
+    node = Node()
+    rct = node.rct
+
+    results["set_value[same]"] = measure(lambda: rct._set_value("count", 0, False), number=NUMBER)
+
+    values = iter(range(10 ** 9))
+    results["set_value[changed]"] = measure(lambda: rct._set_value("count", next(values), False), number=NUMBER)
+    results["setattr[changed]"] = measure(lambda: setattr(node, "count", next(values)), number=NUMBER)
+
+    for dependents in (1, 10):
+        node = Node()
+        for i in range(dependents):
+            setattr(node, f"double{i}", node.rct.computed(lambda node=node: node.count * 2))
+
+        results[f"set_value[computed={dependents}]"] = \
+            measure(lambda: node.rct._set_value("count", next(values), False), number=NUMBER // dependents)
+
+    # computed values are evaluated when read, once for any number of writes before
+    node = Node()
+    node.double = node.rct.computed(lambda: node.count * 2)
+
+    def writes_then_read():
+        for _ in range(10):
+            node.rct._set_value("count", next(values), False)
+        return node.double
+
+    results["computed[10 writes, read]"] = measure(writes_then_read, number=NUMBER // 10)
+
+    for watchers in (1, 10):
+        node = Node()
+        for _ in range(watchers):
+            node.rct.watch(lambda node=node: node.count, lambda value, prev_value: None, immediate=False)
+
+        results[f"set_value[watchers={watchers}]"] = \
+            measure(lambda: node.rct._set_value("count", next(values), False), number=NUMBER // watchers)
+
+
+def bench_getattribute(results):
+    node = Node()
+    plain = Plain()
+
+    results["getattribute[plain object]"] = measure(lambda: plain.count, number=NUMBER * 5)
+    results["getattribute[state]"] = measure(lambda: node.count, number=NUMBER * 5)
+    results["getattribute[private]"] = measure(lambda: node._props, number=NUMBER * 5)
+    results["getattribute[blacklisted method]"] = measure(lambda: node.render, number=NUMBER * 5)
+    results["getattribute[property]"] = measure(lambda: node.rendered_children, number=NUMBER * 5)
+    results["props[key]"] = measure(lambda: node.props.key, number=NUMBER * 5)
+
+    # reads inside computed expressions are recorded as dependencies
+    rct = node.rct
+    rct._is_recording_enabled = True
+    results["getattribute[state, recording]"] = measure(lambda: node.count, number=NUMBER * 5)
+    rct._is_recording_enabled = False
+
+
+def bench_state_fields(results):
+    node = ExplicitNode()
+    values = iter(range(10 ** 9))
+
+    results["state_field[get]"] = measure(lambda: node.count, number=NUMBER * 5)
+    results["state_field[set changed]"] = measure(lambda: setattr(node, "count", next(values)), number=NUMBER)
+    results["explicit[plain attribute]"] = measure(lambda: node.other, number=NUMBER * 5)
+    results["explicit[method]"] = measure(lambda: node.render, number=NUMBER * 5)
+    results["explicit[property]"] = measure(lambda: node.rendered_children, number=NUMBER * 5)
+    results["explicit[setattr plain]"] = measure(lambda: setattr(node, "other", next(values)), number=NUMBER)
+
+
+def main():
+    args = parse_args()
+    results = {}
+
+    bench_set_value(results)
+    bench_getattribute(results)
+    bench_state_fields(results)
+
+    report("bench_reactivity", results, args.json)
+
+
+if __name__ == "__main__":
+    main()
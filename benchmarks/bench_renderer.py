@@ -0,0 +1,176 @@
+"""
+Renderer hot paths on parameterised trees: deep component chains, wide For lists, many windows and
+large keyboards. Measures the first render, a full re-render, a single leaf update and the DOM diff,
+and the crossover between the list and numpy versions of the DOM diff table.
+
+    python -m rtgbot.benchmarks.bench_renderer [--json results.json]
+"""
+import dataclasses
+
+from rtgbot.benchmarks.bench_session_creation import NullMessageSender
+from rtgbot.benchmarks.harness import measure, measure_async, parse_args, report
+from rtgbot.components.base import Component, PureComponent, Window, WindowsGroup
+from rtgbot.components.for_each import For
+from rtgbot.components.layout import Group
+from rtgbot.components.widgets import Button, Text
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.renderer import Renderer, np
+from rtgbot.user_session import UserSession
+
+
+class Counter(Window):
+    async def setup(self):
+        self.count = 0
+
+    async def render(self):
+        return Text(f"count {self.count}"), Button()("+1")
+
+
+def deep_tree(depth: int):
+    node = Text("leaf")
+    for _ in range(depth):
+        node = Component()(node)
+    return WindowsGroup()(Counter(key="counter"), Window(key="deep")(node))
+
+
+def wide_list(items: int):
+    return WindowsGroup()(
+        Counter(key="counter"),
+        Window(key="list")(For(items=list(range(items)))(lambda item, i: Text(f"item {item}"))),
+    )
+
+
+def wide_list_pure(items: int):
+    # the same list behind a memoized component, re-renders of the parent skip it
+    return WindowsGroup()(
+        Counter(key="counter"),
+        Window(key="list")(PureComponent()(For(items=list(range(items)))(lambda item, i: Text(f"item {item}")))),
+    )
+
+
+def many_windows(windows: int):
+    return WindowsGroup()(
+        Counter(key="counter"),
+        *[Window(key=f"window{i}")(Text(f"window {i}"), Button()("button")) for i in range(windows)],
+    )
+
+
+def large_keyboard(buttons: int):
+    return WindowsGroup()(
+        Counter(key="counter"),
+        Window(key="keyboard")(Text("keyboard"), Group(width=8)(*[Button()(f"{i}") for i in range(buttons)])),
+    )
+
+
+TREES = {
+    "deep": (deep_tree, (10, 50, 100)),
+    "wide_for": (wide_list, (10, 100, 500)),
+    "wide_for_pure": (wide_list_pure, (10, 100, 500)),
+    "windows": (many_windows, (5, 20, 100)),
+    "keyboard": (large_keyboard, (10, 50, 100)),
+}
+
+
+def make_session(build_tree, size: int):
+    return UserSession(None, UserInfo(1), build_tree(size), NullMessageSender())
+
+
+def find_node(node, node_type):
+    if isinstance(node, node_type):
+        return node
+
+    for child in node.rendered_children_all.values():
+        found = find_node(child, node_type)
+        if found:
+            return found
+
+    return None
+
+
+def bench_tree(results, name: str, build_tree, size: int):
+    number = max(3, 300 // size)
+
+    async def first_render():
+        session = make_session(build_tree, size)
+        await session.renderer.render([session.root])
+
+    results[f"first_render[{name}={size}]"] = measure_async(first_render, number=number)
+
+    session = counter = None
+
+    async def setup():
+        nonlocal session, counter
+        session = make_session(build_tree, size)
+        await session.renderer.render([session.root])
+        counter = find_node(session.renderer.component_tree, Counter)
+
+    async def full_rerender():
+        await session.renderer.render([session.root])
+
+    async def leaf_update():
+        counter.count += 1
+        await session.renderer.render([counter], counter)
+
+    results[f"full_rerender[{name}={size}]"] = measure_async(full_rerender, number=number, setup=setup)
+    results[f"leaf_update[{name}={size}]"] = measure_async(leaf_update, number=number * 5, setup=setup)
+
+
+def bench_dom_diff(results):
+    for windows in (5, 20, 50, 100):
+        session = make_session(many_windows, windows)
+        measure_async(lambda: session.renderer.render([session.root]), number=1, repeat=1)
+        dom = session.renderer.dom
+
+        middle = len(dom) // 2
+        changed = dataclasses.replace(dom[middle], text=dom[middle].text + "!")
+
+        variants = {
+            "same": list(dom),
+            "edit": dom[:middle] + [changed] + dom[middle + 1:],
+            "insert": dom[:middle] + [changed] + dom[middle:],
+            "delete": dom[:middle] + dom[middle + 1:],
+        }
+
+        number = max(3, 2000 // (windows * windows))
+        for variant, new_dom in variants.items():
+            results[f"dom_edit_actions[{variant},messages={len(dom)}]"] = \
+                measure(lambda: Renderer._calculate_dom_edit_actions(dom, new_dom, None), number=number)
+
+
+def bench_dom_diff_table(results):
+    # an inserted message defeats the aligned fast path, so the whole table is filled
+    for windows in (2, 5, 10, 15, 20, 30, 50, 100):
+        session = make_session(many_windows, windows)
+        measure_async(lambda: session.renderer.render([session.root]), number=1, repeat=1)
+        dom = session.renderer.dom
+
+        middle = len(dom) // 2
+        changed = dataclasses.replace(dom[middle], text=dom[middle].text + "!")
+        new_dom = dom[:middle] + [changed] + dom[middle:]
+
+        number = max(3, 2000 // (windows * windows))
+        for variant in ("list", "numpy"):
+            if variant == "numpy" and np is None:
+                continue
+
+            use_numpy = variant == "numpy"
+            results[f"dom_edit_table[{variant},cells={len(dom) * len(new_dom)}]"] = \
+                measure(lambda: Renderer._calculate_dom_edit_actions(dom, new_dom, None, use_numpy), number=number)
+
+
+def main():
+    args = parse_args()
+    results = {}
+
+    for name, (build_tree, sizes) in TREES.items():
+        for size in sizes:
+            bench_tree(results, name, build_tree, size)
+
+    bench_dom_diff(results)
+    bench_dom_diff_table(results)
+
+    report("bench_renderer", results, args.json)
+
+
+if __name__ == "__main__":
+    main()
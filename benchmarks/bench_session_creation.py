@@ -0,0 +1,73 @@
+"""
+Compares ways of creating the start screen of a new user session: deepcopy of a prototype,
+prototype cloning and a screen factory, alone and together with the first render.
+
+    python -m rtgbot.benchmarks.bench_session_creation [--json results.json]
+"""
+import copy
+
+from rtgbot.benchmarks.harness import measure, measure_async, parse_args, report
+from rtgbot.components.base import Window, WindowsGroup
+from rtgbot.components.checkbox import Checkbox
+from rtgbot.components.layout import Row
+from rtgbot.components.paginator import Paginator
+from rtgbot.components.select import Select
+from rtgbot.components.widgets import Button, Text
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.user_session import UserSession
+
+
+class NullMessageSender:
+    def schedule_screen_reset(self, chat_id, dom):
+        pass
+
+    def schedule_screen_update(self, chat_id, dom, dom_update, prev_dom=None, force_update_message_key=None):
+        pass
+
+
+def build_screen(windows: int = 5):
+    return WindowsGroup()(
+        *[
+            Window(key=f"window{i}")(
+                Text(f"window {i}"),
+                Row()(*[Button()(f"button {j}") for j in range(4)]),
+                Paginator(count=20),
+                Select(options=[f"option {j}" for j in range(6)])(lambda item, selected: item),
+                Checkbox()(lambda checked: checked and "on" or "off"),
+            )
+            for i in range(windows)
+        ]
+    )
+
+
+def main():
+    args = parse_args()
+    results = {}
+
+    prototype = build_screen()
+    screen_makers = {
+        "deepcopy": lambda: copy.deepcopy(prototype),
+        "clone": prototype.clone,
+        "factory": build_screen,
+    }
+
+    for name, make_screen in screen_makers.items():
+        results[f"create_screen[{name}]"] = measure(make_screen, number=200)
+
+    for name, make_screen in screen_makers.items():
+        async def create_session(make_screen=make_screen):
+            session = UserSession(None, UserInfo(1), make_screen(), NullMessageSender())
+            await session.start()
+            await session.stop()
+
+        results[f"create_and_start_session[{name}]"] = measure_async(create_session, number=50)
+
+    report("session_creation", results, args.json)
+
+    for name in screen_makers:
+        result = results[f"create_and_start_session[{name}]"]
+        print(f"  {name}: {1 / result['median']:.0f} sessions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Runs a sharded runner against the fake Bot API. Simulated users send /start and press buttons,
+and the per-worker load metrics are printed at the end.
+
+    python -m rtgbot.benchmarks.bench_sharded_runner [--json results.json]
+"""
+import asyncio
+import functools
+import random
+import sys
+import time
+
+from rtgbot.benchmarks.bench_session_creation import build_screen
+from rtgbot.benchmarks.fake_bot_api import FakeBotApi, UNLIMITED_RATE_LIMITS
+from rtgbot.benchmarks.harness import parse_args, report
+from rtgbot.runner import Runner
+from rtgbot.sharded_runner import ShardedRunner
+
+WORKERS = 4
+USERS = 200
+CLICKS_PER_USER = 5
+TOKEN = "123456:sharded"
+
+
+def make_runner(api_base_url: str):
+    return Runner(build_screen(1), TOKEN, api_base_url=api_base_url, rate_limits=UNLIMITED_RATE_LIMITS,
+                  input_coalescing_window=0.)
+
+
+async def wait_idle(api: FakeBotApi, quiet: float = 0.5):
+    calls = -1
+    while api.pending_updates or calls != sum(api.calls.values()):
+        calls = sum(api.calls.values())
+        await asyncio.sleep(quiet)
+
+
+async def run():
+    api = FakeBotApi()
+    await api.start()
+
+    runner = ShardedRunner(functools.partial(make_runner, api.base_url), TOKEN, workers=WORKERS,
+                           api_base_url=api.base_url, metrics_interval=0.2)
+    runner.start()
+    await runner.wait_ready()
+
+    start = time.perf_counter()
+
+    for user_id in range(1, USERS + 1):
+        api.push_message(user_id, "/start")
+    await wait_idle(api)
+
+    clicks = 0
+    for _ in range(CLICKS_PER_USER):
+        for user_id in range(1, USERS + 1):
+            buttons = api.get_buttons(user_id)
+            if buttons:
+                api.push_callback_query(user_id, *random.choice(buttons))
+                clicks += 1
+        await asyncio.sleep(0.05)
+    await wait_idle(api)
+
+    elapsed = time.perf_counter() - start
+
+    await runner.stop()
+    await api.stop()
+
+    return elapsed, clicks, runner, api
+
+
+def main():
+    args = parse_args()
+
+    elapsed, clicks, runner, api = asyncio.run(run())
+    updates = USERS + clicks
+
+    report("bench_sharded_runner", {
+        "updates": {"min": elapsed / updates, "median": elapsed / updates, "mean": elapsed / updates,
+                    "number": updates, "repeat": 1},
+    }, args.json)
+
+    print(f"  routed updates: {runner.routed_updates}, api calls: {dict(api.calls)}")
+    for worker, stats in sorted(runner.worker_stats.items()):
+        print(f"  worker {worker}: updates {stats.updates}, sessions {stats.sessions}, failed {stats.failed}, "
+              f"loop lag {stats.loop_lag * 1e3:.1f} ms, render p95 {stats.render_latency_p95 * 1e3:.1f} ms")
+
+    sessions = sum(stats.sessions for stats in runner.worker_stats.values())
+    if sessions != USERS or runner.routed_updates != updates:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Starts the webhook server on localhost and posts message updates to it the way Telegram does,
+including requests with a wrong secret token that must be rejected.
+
+    python -m rtgbot.benchmarks.bench_webhook [--json results.json]
+"""
+import asyncio
+import sys
+import time
+
+import aiohttp
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+
+from rtgbot.benchmarks.harness import parse_args, report
+from rtgbot.webhook_server import WebhookServer, WebhookConfig
+
+UPDATES = 2000
+REJECTED = 50
+CONCURRENCY = 64
+PORT = 18080
+SECRET_TOKEN = "local-secret"
+
+
+def make_update(update_id: int):
+    user = {"id": update_id % 100 + 1, "is_bot": False, "first_name": "user"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+            "text": f"message {update_id}",
+        },
+    }
+
+
+async def run():
+    handled = 0
+
+    dispatcher = Dispatcher()
+
+    @dispatcher.message()
+    async def handle_message(message: Message):
+        nonlocal handled
+        await asyncio.sleep(0.001)
+        handled += 1
+
+    server = WebhookServer(Bot("123456:webhook"), dispatcher,
+                           WebhookConfig(host="127.0.0.1", port=PORT, secret_token=SECRET_TOKEN))
+    await server.start()
+
+    url = f"http://127.0.0.1:{PORT}{server.config.path}"
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    statuses = []
+
+    async with aiohttp.ClientSession() as client:
+        async def post(update_id: int, secret_token: str):
+            async with semaphore:
+                headers = {WebhookServer.SECRET_TOKEN_HEADER: secret_token}
+                async with client.post(url, json=make_update(update_id), headers=headers) as response:
+                    statuses.append(response.status)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[post(i, SECRET_TOKEN) for i in range(UPDATES)],
+                             *[post(UPDATES + i, "wrong") for i in range(REJECTED)])
+        await server.stop()
+        elapsed = time.perf_counter() - start
+
+    return elapsed, handled, server.stats, statuses.count(401)
+
+
+def main():
+    args = parse_args()
+
+    elapsed, handled, stats, rejected = asyncio.run(run())
+
+    report("bench_webhook", {
+        "updates": {"min": elapsed / UPDATES, "median": elapsed / UPDATES, "mean": elapsed / UPDATES,
+                    "number": UPDATES, "repeat": 1},
+    }, args.json)
+    print(f"  handled: {handled}/{UPDATES}, rejected: {rejected}/{REJECTED}, {UPDATES / elapsed:.0f} updates/s")
+
+    if handled != UPDATES or rejected != REJECTED:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares two benchmark runs saved with --json. Each side is a results file or a directory of them,
+e.g. the output directories of two run_all invocations.
+
+    python -m rtgbot.benchmarks.compare baseline/ current/ [--threshold 0.1]
+
+Exits with status 1 when a benchmark got slower by more than the threshold.
+"""
+import argparse
+import json
+import os
+import sys
+import typing as tp
+
+
+def load_results(path: str) -> tp.Dict[str, tp.Dict[str, float]]:
+    if os.path.isdir(path):
+        paths = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".json")]
+    else:
+        paths = [path]
+
+    results = {}
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        for name, result in data["results"].items():
+            results[f"{data['suite']}.{name}"] = result
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, 0.1 is 10%%")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+
+    names = [name for name in current if name in baseline]
+    if not names:
+        print("no common benchmarks")
+        return
+
+    width = max(len(name) for name in names)
+    regressions = 0
+
+    for name in names:
+        before = baseline[name]["median"]
+        after = current[name]["median"]
+        ratio = after / before if before else 1.
+
+        mark = ""
+        if ratio > 1 + args.threshold:
+            mark = "  slower"
+            regressions += 1
+        elif ratio < 1 - args.threshold:
+            mark = "  faster"
+
+        print(f"{name:<{width}}  {before * 1e6:12.2f} us  {after * 1e6:12.2f} us  {ratio:6.2f}x{mark}")
+
+    for name in sorted(set(baseline) - set(current)):
+        print(f"{name:<{width}}  missing in current run")
+
+    if regressions:
+        print(f"{regressions} benchmark(s) slower by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+In-process fake of the Telegram Bot API for local load runs.
+
+Runners talk to it through api_base_url=FakeBotApi.base_url. Updates pushed with push_update are
+served to getUpdates, or posted to the webhook once one is set. Sent messages are kept per chat, so
+simulated users can press the buttons they were shown. Every call can be delayed by a configurable
+latency, and a share of calls can be answered with 429 flood control errors.
+"""
+import asyncio
+import collections
+import itertools
+import json
+import random
+import time
+import typing as tp
+
+import aiohttp
+from aiohttp import web
+
+from rtgbot.rate_limiter import RateLimits
+
+# the fake API has no flood control of its own, so only the framework limits throughput
+UNLIMITED_RATE_LIMITS = RateLimits(global_rate=1e6, global_burst=1e6, chat_rate=1e6, chat_burst=1e6,
+                                   group_rate=1e6, group_burst=1e6)
+
+
+class FakeBotApi:
+    BOT_USER = {"id": 1, "is_bot": True, "first_name": "bot", "username": "fake_bot"}
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 18081,
+                 latency: float = 0., latency_jitter: float = 0., flood_rate: float = 0., retry_after: int = 1):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+
+        self.calls: tp.Counter[str] = collections.Counter()
+        self.floods = 0
+        self.chats: tp.Dict[int, tp.Dict[int, tp.Dict]] = collections.defaultdict(dict)
+        self.on_call: tp.Optional[tp.Callable[[str, tp.Dict], None]] = None
+
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._callback_query_ids = itertools.count(1)
+        self._updates: tp.List[tp.Dict] = []
+        self._has_updates = asyncio.Event()
+        self._app_runner: tp.Optional[web.AppRunner] = None
+
+        self._webhook_url: tp.Optional[str] = None
+        self._webhook_secret_token: tp.Optional[str] = None
+        self._webhook_client: tp.Optional[aiohttp.ClientSession] = None
+        self._webhook_tasks: tp.Set[asyncio.Task] = set()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def pending_updates(self):
+        # updates stay pending until a later getUpdates call confirms them with its offset
+        return len(self._updates)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle)
+
+        self._app_runner = web.AppRunner(app, access_log=None)
+        await self._app_runner.setup()
+        await web.TCPSite(self._app_runner, self.host, self.port).start()
+
+    async def stop(self):
+        self._has_updates.set()
+        if self._webhook_tasks:
+            await asyncio.gather(*self._webhook_tasks, return_exceptions=True)
+        if self._webhook_client:
+            await self._webhook_client.close()
+        await self._app_runner.cleanup()
+
+    def push_update(self, update: tp.Dict) -> int:
+        update_id = update["update_id"] = next(self._update_ids)
+
+        if self._webhook_url:
+            task = asyncio.create_task(self._post_webhook(update))
+            self._webhook_tasks.add(task)
+            task.add_done_callback(self._webhook_tasks.discard)
+        else:
+            self._updates.append(update)
+            self._has_updates.set()
+
+        return update_id
+
+    def push_message(self, user_id: int, text: str):
+        return self.push_update({"message": {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+        }})
+
+    def push_callback_query(self, user_id: int, message: tp.Dict, data: str) -> str:
+        callback_query_id = str(next(self._callback_query_ids))
+        self.push_update({"callback_query": {
+            "id": callback_query_id,
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "message": message,
+            "data": data,
+        }})
+        return callback_query_id
+
+    def get_buttons(self, chat_id: int) -> tp.List[tp.Tuple[tp.Dict, str]]:
+        buttons = []
+
+        for message in self.chats[chat_id].values():
+            for row in message.get("reply_markup", {}).get("inline_keyboard", []):
+                for button in row:
+                    if "callback_data" in button:
+                        buttons.append((message, button["callback_data"]))
+
+        return buttons
+
+    async def _handle(self, request: web.Request):
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] += 1
+
+        if method != "getUpdates":
+            if self.latency or self.latency_jitter:
+                await asyncio.sleep(self.latency + random.random() * self.latency_jitter)
+
+            if self.flood_rate and random.random() < self.flood_rate:
+                self.floods += 1
+                return web.json_response({
+                    "ok": False, "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }, status=429)
+
+        handler = getattr(self, f"_api_{method}", None)
+        result = await handler(params) if handler else True
+
+        if isinstance(result, web.Response):
+            return result
+
+        if self.on_call:
+            self.on_call(method, params)
+        return web.json_response({"ok": True, "result": result})
+
+    async def _api_getMe(self, params):
+        return self.BOT_USER
+
+    async def _api_getUpdates(self, params):
+        offset = int(params.get("offset", 0))
+        self._updates = [update for update in self._updates if update["update_id"] >= offset]
+
+        if not self._updates:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), min(float(params.get("timeout", 0)), 1.))
+            except asyncio.TimeoutError:
+                pass
+
+        return self._updates[:100]
+
+    async def _api_setWebhook(self, params):
+        self._webhook_url = params["url"]
+        self._webhook_secret_token = params.get("secret_token")
+        if self._webhook_client is None:
+            self._webhook_client = aiohttp.ClientSession()
+        return True
+
+    async def _api_deleteWebhook(self, params):
+        self._webhook_url = None
+        return True
+
+    async def _post_webhook(self, update: tp.Dict):
+        headers = {}
+        if self._webhook_secret_token:
+            headers["X-Telegram-Bot-Api-Secret-Token"] = self._webhook_secret_token
+
+        # Telegram redelivers updates the server did not accept
+        while self._webhook_url:
+            try:
+                async with self._webhook_client.post(self._webhook_url, json=update, headers=headers) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.1)
+
+    async def _api_sendMessage(self, params):
+        return self._store_message(params, {"text": params.get("text", "")})
+
+    async def _api_sendPhoto(self, params):
+        return self._store_message(params, {
+            "caption": params.get("caption", ""),
+            "photo": [{"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}],
+        })
+
+    async def _api_editMessageText(self, params):
+        return self._edit_message(params, {"text": params.get("text", "")})
+
+    async def _api_editMessageCaption(self, params):
+        return self._edit_message(params, {"caption": params.get("caption", "")})
+
+    async def _api_editMessageMedia(self, params):
+        return self._edit_message(params, {})
+
+    async def _api_editMessageReplyMarkup(self, params):
+        return self._edit_message(params, {})
+
+    async def _api_deleteMessage(self, params):
+        self.chats[int(params["chat_id"])].pop(int(params["message_id"]), None)
+        return True
+
+    async def _api_deleteMessages(self, params):
+        messages = self.chats[int(params["chat_id"])]
+        for message_id in json.loads(params["message_ids"]):
+            messages.pop(message_id, None)
+        return True
+
+    def _store_message(self, params, content: tp.Dict):
+        chat_id = int(params["chat_id"])
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": self.BOT_USER,
+            **content,
+        }
+        if "reply_markup" in params:
+            message["reply_markup"] = json.loads(params["reply_markup"])
+
+        self.chats[chat_id][message["message_id"]] = message
+        return message
+
+    def _edit_message(self, params, content: tp.Dict):
+        message = self.chats[int(params["chat_id"])].get(int(params["message_id"]))
+        if message is None:
+            return web.json_response({"ok": False, "error_code": 400,
+                                      "description": "Bad Request: message to edit not found"}, status=400)
+
+        message.update(content)
+        if "reply_markup" in params:
+            message["reply_markup"] = json.loads(params["reply_markup"])
+        else:
+            message.pop("reply_markup", None)
+
+        return message
+
+    @staticmethod
+    def _user(user_id: int):
+        return {"id": user_id, "is_bot": False, "first_name": f"user {user_id}"}
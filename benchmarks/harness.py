@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import typing as tp
+
+
+def measure(func: tp.Callable[[], tp.Any], number: int = 100, repeat: int = 5) -> tp.Dict[str, float]:
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def measure_async(func: tp.Callable[[], tp.Awaitable], number: int = 100, repeat: int = 5,
+                  setup: tp.Callable[[], tp.Awaitable] = None) -> tp.Dict[str, float]:
+    async def run():
+        # state that needs the event loop, e.g. a started session, is prepared outside of the timings
+        if setup:
+            await setup()
+
+        timings = []
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                await func()
+            timings.append((time.perf_counter() - start) / number)
+
+        return timings
+
+    timings = asyncio.run(run())
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def parse_args(**options):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", help="save results to a JSON file")
+
+    # extra options of a benchmark, given as name=default
+    for name, default in options.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+
+    return parser.parse_args()
+
+
+def report(suite: str, results: tp.Dict[str, tp.Dict[str, float]], output: str = None):
+    width = max(len(name) for name in results)
+
+    print(f"{suite}:")
+    for name, result in results.items():
+        print(f"  {name:<{width}}  {result['median'] * 1e6:12.2f} us  (min {result['min'] * 1e6:.2f} us)")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump({
+                "suite": suite,
+                "python": sys.version,
+                "platform": platform.platform(),
+                "results": results,
+            }, f, indent=2)
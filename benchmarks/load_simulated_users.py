@@ -0,0 +1,188 @@
+"""
+Load test against the fake Bot API: thousands of simulated users open the bot and click through
+a sample component tree. Reports click-to-edit and click-to-ack latency and Bot API calls per click.
+
+    python -m rtgbot.benchmarks.load_simulated_users [--users 2000] [--clicks 5] [--think-time 0.5]
+        [--latency 0.02] [--flood-rate 0.01] [--webhook 1] [--json results.json]
+"""
+import asyncio
+import random
+import time
+
+from rtgbot.benchmarks.fake_bot_api import FakeBotApi, UNLIMITED_RATE_LIMITS
+from rtgbot.benchmarks.harness import parse_args, report
+from rtgbot.components.base import Window
+from rtgbot.components.checkbox import Checkbox
+from rtgbot.components.layout import Row
+from rtgbot.components.navigation_buttons import Navigate, Back
+from rtgbot.components.paginator import Paginator
+from rtgbot.components.select import Select
+from rtgbot.components.widgets import Button, Text
+from rtgbot.runner import Runner
+from rtgbot.webhook_server import WebhookConfig
+
+TOKEN = "123456:load"
+SCREEN_METHODS = {"sendMessage", "sendPhoto", "editMessageText", "editMessageCaption",
+                  "editMessageMedia", "editMessageReplyMarkup"}
+SETUP_METHODS = {"getUpdates", "getMe", "setMyCommands", "setWebhook", "deleteWebhook"}
+
+
+class DetailsWindow(Window):
+    async def render(self):
+        return (
+            Text("details"),
+            Paginator(count=50),
+            Back()("back"),
+        )
+
+
+class SampleWindow(Window):
+    async def setup(self):
+        self.count = 0
+
+    async def render(self):
+        return (
+            Text(f"clicks: {self.count}"),
+            Row()(
+                Button(on_click=self.increment)("+1"),
+                Button(on_click=self.decrement)("-1"),
+            ),
+            Paginator(count=20),
+            Select(options=[f"option {i}" for i in range(5)])(
+                lambda item, selected: selected and f"[{item}]" or item),
+            Checkbox()(lambda checked: checked and "on" or "off"),
+            Navigate(to=DetailsWindow)("details"),
+        )
+
+    async def increment(self, e):
+        self.count += 1
+
+    async def decrement(self, e):
+        self.count -= 1
+
+
+def summarize(latencies):
+    latencies = sorted(latencies) or [0.]
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(q / 100 * len(latencies)))]
+
+    return {
+        "min": latencies[0],
+        "median": percentile(50),
+        "mean": sum(latencies) / len(latencies),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "max": latencies[-1],
+        "number": len(latencies),
+        "repeat": 1,
+    }
+
+
+async def run(args):
+    api = FakeBotApi(latency=args.latency, latency_jitter=args.latency / 2, flood_rate=args.flood_rate)
+    await api.start()
+
+    screen_updated = {}
+    acks_pending = {}
+    ack_latencies = []
+
+    def on_call(method, params):
+        if method in SCREEN_METHODS:
+            event = screen_updated.get(int(params["chat_id"]))
+            if event:
+                event.set()
+        elif method == "answerCallbackQuery":
+            pushed_at = acks_pending.pop(params["callback_query_id"], None)
+            if pushed_at:
+                ack_latencies.append(time.perf_counter() - pushed_at)
+
+    api.on_call = on_call
+
+    webhook = WebhookConfig(url="http://127.0.0.1:18082/webhook", host="127.0.0.1", port=18082) \
+        if args.webhook else None
+    runner = Runner(SampleWindow, TOKEN, api_base_url=api.base_url, webhook=webhook,
+                    rate_limits=None if args.rate_limited else UNLIMITED_RATE_LIMITS,
+                    input_coalescing_window=0.)
+    runner.start()
+
+    async def open_bot(user_id: int):
+        await asyncio.sleep(random.random() * args.ramp_up)
+
+        event = screen_updated[user_id] = asyncio.Event()
+        api.push_message(user_id, "/start")
+        try:
+            await asyncio.wait_for(event.wait(), args.timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    edit_latencies = []
+    clicks_without_edit = 0
+
+    async def click_through(user_id: int):
+        nonlocal clicks_without_edit
+        event = screen_updated[user_id]
+
+        for _ in range(args.clicks):
+            await asyncio.sleep(random.random() * args.think_time)
+
+            buttons = api.get_buttons(user_id)
+            if not buttons:
+                return
+
+            event.clear()
+            pushed_at = time.perf_counter()
+            acks_pending[api.push_callback_query(user_id, *random.choice(buttons))] = pushed_at
+
+            # some clicks do not change the screen, e.g. the current page of the paginator
+            try:
+                await asyncio.wait_for(event.wait(), args.timeout)
+                edit_latencies.append(time.perf_counter() - pushed_at)
+            except asyncio.TimeoutError:
+                clicks_without_edit += 1
+
+    users = range(1, args.users + 1)
+    try:
+        await asyncio.gather(*[open_bot(user_id) for user_id in users])
+
+        calls_before = sum(count for method, count in api.calls.items() if method not in SETUP_METHODS)
+        start = time.perf_counter()
+
+        await asyncio.gather(*[click_through(user_id) for user_id in users])
+
+        elapsed = time.perf_counter() - start
+        calls = sum(count for method, count in api.calls.items() if method not in SETUP_METHODS) - calls_before
+    finally:
+        await runner.stop()
+        await api.stop()
+
+    clicks = len(edit_latencies) + clicks_without_edit
+    return {
+        "click_to_edit": summarize(edit_latencies),
+        "click_to_ack": summarize(ack_latencies),
+    }, {
+        "clicks": clicks,
+        "clicks_without_edit": clicks_without_edit,
+        "clicks_per_second": clicks / elapsed,
+        "api_calls_per_click": calls / max(clicks, 1),
+        "flood_errors": api.floods,
+        "api_calls": dict(api.calls),
+    }
+
+
+def main():
+    args = parse_args(users=1000, clicks=5, think_time=0.5, ramp_up=2., timeout=3., latency=0.,
+                      flood_rate=0., rate_limited=0, webhook=0)
+
+    results, totals = asyncio.run(run(args))
+
+    report("load_simulated_users", results, args.json)
+    for name, result in results.items():
+        print(f"  {name}: p50 {result['median'] * 1e3:.1f} ms, p95 {result['p95'] * 1e3:.1f} ms, "
+              f"p99 {result['p99'] * 1e3:.1f} ms")
+    for name, value in totals.items():
+        print(f"  {name}: {value:.2f}" if isinstance(value, float) else f"  {name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
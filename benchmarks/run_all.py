@@ -0,0 +1,43 @@
+"""
+Runs the micro benchmark suites and saves one results file per suite into a directory,
+ready to be compared with another run.
+
+    python -m rtgbot.benchmarks.run_all results/ [--suite bench_renderer ...]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SUITES = (
+    "bench_renderer",
+    "bench_reactivity",
+    "bench_components",
+    "bench_session_creation",
+    "bench_message_info_storage",
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output", help="directory for the results files")
+    parser.add_argument("--suite", action="append", choices=SUITES, help="run only the given suites")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+
+    failed = []
+    for suite in args.suite or SUITES:
+        # every suite gets a fresh interpreter, so earlier suites do not warm up or pollute later ones
+        result = subprocess.run([sys.executable, "-m", f"rtgbot.benchmarks.{suite}",
+                                 "--json", os.path.join(args.output, f"{suite}.json")])
+        if result.returncode:
+            failed.append(suite)
+
+    if failed:
+        print(f"failed suites: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
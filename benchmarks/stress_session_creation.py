@@ -0,0 +1,71 @@
+"""
+Fires concurrent /start and callback updates for the same new users and checks that each user
+gets exactly one session.
+
+    python -m rtgbot.benchmarks.stress_session_creation [--json results.json]
+"""
+import asyncio
+import collections
+import random
+import sys
+import time
+
+from rtgbot.benchmarks.bench_session_creation import NullMessageSender, build_screen
+from rtgbot.benchmarks.harness import parse_args, report
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.runner import Runner
+
+USERS = 200
+UPDATES_PER_USER = 8
+
+
+async def run():
+    started = collections.Counter()
+
+    async def on_started(user_info: UserInfo):
+        started[user_info.user_id] += 1
+        # widen the race window
+        await asyncio.sleep(random.random() * 0.01)
+
+    runner = Runner(build_screen(1), "123456:stress", on_user_session_started=on_started)
+    runner.message_sender = NullMessageSender()
+
+    async def update(user_id: int, is_start: bool):
+        await asyncio.sleep(random.random() * 0.005)
+        session, created = await runner._get_user_session(UserInfo(user_id), display=is_start)
+        if not created and is_start:
+            await session.schedule_screen_reset()
+
+    updates = [update(user_id, random.random() < 0.5)
+               for user_id in range(USERS) for _ in range(UPDATES_PER_USER)]
+    random.shuffle(updates)
+
+    start = time.perf_counter()
+    await asyncio.gather(*updates)
+    elapsed = time.perf_counter() - start
+
+    for user_id in runner.user_sessions.keys():
+        await runner.user_sessions[user_id].stop()
+
+    duplicates = sum(count - 1 for count in started.values())
+    return elapsed, len(runner.user_sessions), duplicates
+
+
+def main():
+    args = parse_args()
+
+    elapsed, sessions, duplicates = asyncio.run(run())
+    updates = USERS * UPDATES_PER_USER
+
+    report("stress_session_creation", {
+        "updates": {"min": elapsed / updates, "median": elapsed / updates, "mean": elapsed / updates,
+                    "number": updates, "repeat": 1},
+    }, args.json)
+    print(f"  users: {USERS}, sessions: {sessions}, duplicate sessions: {duplicates}")
+
+    if sessions != USERS or duplicates:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,15 @@
+import copy
+
 from aiogram import types
 from aiogram.enums import ParseMode
 import typing as tp
 
-from rtgbot.base import ComponentTreeNode
+from rtgbot.base import ComponentTreeNode, StateField
 from rtgbot.decorators import register_props
 from rtgbot.etities.dom import KeyboardData, MessageElement, DOM, InputElement, MediaElement
 
 
-class Component(ComponentTreeNode):
+class Component(ComponentTreeNode, explicit_state=True):
     @register_props
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -53,11 +55,20 @@ class Component(ComponentTreeNode):
         return inputs
 
 
+class PureComponent(Component, explicit_state=True):
+    # re-rendered by its parent only when props change, children passed to it are not compared
+    def should_update(self, updated_props):
+        return len(updated_props) > 0
+
+
 WindowChild = tp.Union['Window', Component, str]
 WindowChildren = WindowChild | tp.Tuple[WindowChild, ...]
 
 
-class Window(Component):
+class Window(Component, explicit_state=True):
+    # set by the navigator, re-renders the screen also when its other state is explicit
+    state = StateField()
+
     @register_props
     def __init__(self,
                  route: str = None,
@@ -67,8 +78,16 @@ class Window(Component):
                  **kwargs):
         super().__init__(**kwargs)
 
+        self._message: tp.Optional[MessageElement] = None
+        self._message_render_cycle_id = -1
+
     def render_message(self):
-        return MessageElement(
+        # the message is rebuilt only when the window or any of its descendants was rendered since the last build
+        subtree_render_cycle_id = self._render_data.subtree_render_cycle_id
+        if self._message is not None and self._message_render_cycle_id == subtree_render_cycle_id:
+            return self._message
+
+        self._message = MessageElement(
             tree_node=self,
             media=self.render_media(),
             text=self.render_text(),
@@ -78,13 +97,18 @@ class Window(Component):
             disable_web_page_preview=self.props.disable_web_page_preview,
             enable_notification=self.props.enable_notification
         )
+        self._message_render_cycle_id = subtree_render_cycle_id
+
+        return self._message
 
 
 WindowsGroupChild = tp.Union['WindowsGroup', Window | Component | str]
 WindowsGroupChildren = WindowsGroupChild | tp.Tuple[WindowsGroupChild, ...]
 
 
-class WindowsGroup(ComponentTreeNode):
+class WindowsGroup(ComponentTreeNode, explicit_state=True):
+    state = StateField()
+
     @register_props
     def __init__(self,
                  route: str = None,
@@ -108,11 +132,15 @@ class WindowsGroup(ComponentTreeNode):
                     messages.extend(collect_recursive(child, enable_notification, disable_web_page_preview))
                 else:
                     message = child.render_message()
-                    # override properties
-                    if enable_notification is not None:
-                        message.enable_notification = enable_notification
-                    if disable_web_page_preview is not None:
-                        message.disable_web_page_preview = disable_web_page_preview
+                    # override properties, the cached message of the window is kept as rendered
+                    if enable_notification is not None and message.enable_notification != enable_notification \
+                            or disable_web_page_preview is not None \
+                            and message.disable_web_page_preview != disable_web_page_preview:
+                        message = copy.copy(message)
+                        if enable_notification is not None:
+                            message.enable_notification = enable_notification
+                        if disable_web_page_preview is not None:
+                            message.disable_web_page_preview = disable_web_page_preview
 
                     messages.append(message)
 
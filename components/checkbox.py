@@ -1,3 +1,4 @@
+from rtgbot.base import state
 from rtgbot.components.base import Component
 from rtgbot.decorators import register_props
 from rtgbot.components.widgets import Button, Text
@@ -5,6 +6,8 @@ from rtgbot.utils import expand_component_tree
 
 
 class Checkbox(Component):
+    checked = state(False)
+
     @register_props
     def __init__(self,
                  checked=False,
@@ -24,7 +27,6 @@ class Checkbox(Component):
             else:
                 self.item_getter = lambda item, sel: None
 
-        self.checked = False
         self.rct.watch(lambda: self.props.checked, update_checked, immediate=True)
         self.rct.watch(lambda: self.props.children, update_item_getter, immediate=True)
 
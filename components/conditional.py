@@ -3,7 +3,7 @@ from rtgbot.decorators import register_props
 from rtgbot.utils import expand_component_call_tree
 
 
-class Unsafe(Component):
+class Unsafe(Component, explicit_state=True):
     @register_props
     def __init__(self, display_exceptions=True, **kwargs):
         super().__init__(**kwargs)
@@ -12,7 +12,7 @@ class Unsafe(Component):
         return tuple(expand_component_call_tree(self.props.children, self.props.display_exceptions))
 
 
-class Show(Unsafe):
+class Show(Unsafe, explicit_state=True):
     @register_props
     def __init__(self, cond, **kwargs):
         super().__init__(**kwargs)
@@ -28,7 +28,7 @@ class Show(Unsafe):
         return *children,
 
 
-class Yes(Component):
+class Yes(Component, explicit_state=True):
     def __init__(self, *children, **kwargs):
         super().__init__(**kwargs)
         self(*children)
@@ -37,7 +37,7 @@ class Yes(Component):
         return Unsafe()(*self.props.children)
 
 
-class No(Component):
+class No(Component, explicit_state=True):
     def __init__(self, *children, **kwargs):
         super().__init__(**kwargs)
         self(*children)
@@ -46,7 +46,7 @@ class No(Component):
         return Unsafe()(*self.props.children)
 
 
-class Switch(Component):
+class Switch(Component, explicit_state=True):
     @register_props
     def __init__(self, value, **kwargs):
         super().__init__(**kwargs)
@@ -60,13 +60,13 @@ class Switch(Component):
                 return Component(key=index)(child)
 
 
-class Case(Unsafe):
+class Case(Unsafe, explicit_state=True):
     @register_props
     def __init__(self, value, **kwargs):
         super().__init__(**kwargs)
 
 
-class Match(Unsafe):
+class Match(Unsafe, explicit_state=True):
     @register_props
     def __init__(self, cond, **kwargs):
         super().__init__(**kwargs)
@@ -2,7 +2,7 @@ from rtgbot.components.base import Component
 from rtgbot.decorators import register_props
 
 
-class For(Component):
+class For(Component, explicit_state=True):
     @register_props
     def __init__(self, items, reverse_order=False, **kwargs):
         super().__init__(**kwargs)
@@ -6,7 +6,7 @@ from rtgbot.etities.dom import ButtonElement
 from rtgbot.utils import unpack_kbd_buttons, Symbols
 
 
-class Group(Component):
+class Group(Component, explicit_state=True):
     @register_props
     def __init__(self, width=None, max_width=None, fill_tail=False, fill_evenly=False, style=None, **kwargs):
         if not style:
@@ -55,13 +55,13 @@ class Group(Component):
         return rendered_kbd
 
 
-class Row(Group):
+class Row(Group, explicit_state=True):
     @register_props
     def __init__(self, **kwargs):
         super().__init__(width=9999, **kwargs)
 
 
-class Column(Group):
+class Column(Group, explicit_state=True):
     @register_props
     def __init__(self, **kwargs):
         super().__init__(width=1, **kwargs)
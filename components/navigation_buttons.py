@@ -6,7 +6,7 @@ from rtgbot.components.widgets import Button
 from rtgbot.navigator import NavigationMode
 
 
-class Navigate(Component):
+class Navigate(Component, explicit_state=True):
     @register_props
     def __init__(self,
                  to: Callable[[], Window | WindowsGroup] = None, state=None,
@@ -30,7 +30,7 @@ class Navigate(Component):
         )
 
 
-class Back(Component):
+class Back(Component, explicit_state=True):
     @register_props
     def __init__(self,
                  to: str = None, state=None,
@@ -3,7 +3,7 @@ from rtgbot.components.for_each import For
 from rtgbot.decorators import register_props
 
 
-class NavigationStack(WindowsGroup):
+class NavigationStack(WindowsGroup, explicit_state=True):
     @register_props
     def __init__(self):
         super().__init__()
@@ -1,5 +1,6 @@
 import math
 
+from rtgbot.base import state
 from rtgbot.components.base import Component
 from rtgbot.components.conditional import Show, Yes, No
 from rtgbot.decorators import register_props
@@ -10,6 +11,8 @@ from rtgbot.components.layout import Row, Group
 
 
 class Paginator(Component):
+    page = state(1)
+
     @register_props
     def __init__(self, count: int, visible_count=5, page: int = None,
                  on_page_changed=None, max_rows=1, loop=False,
@@ -21,7 +24,6 @@ class Paginator(Component):
             if page:
                 self.page = page
 
-        self.page = 1
         self.rct.watch(lambda: self.props.page, watch_page, immediate=True)
 
     async def render(self):
@@ -1,3 +1,4 @@
+from rtgbot.base import state
 from rtgbot.components.base import Component
 from rtgbot.decorators import register_props
 from rtgbot.components.for_each import For
@@ -7,6 +8,9 @@ from rtgbot.utils import expand_component_tree
 
 
 class Select(Component):
+    value = state()
+    selected_option_id = state()
+
     @register_props
     def __init__(self,
                  options,
@@ -30,7 +34,6 @@ class Select(Component):
             else:
                 self.item_getter = lambda item, sel: None
 
-        self.value = None
         self.rct.watch(lambda: self.props.value, update_value, immediate=True)
         self.rct.watch(lambda: self.props.children, update_item_getter, immediate=True)
 
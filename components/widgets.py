@@ -9,7 +9,7 @@ from rtgbot.etities.event import ButtonClickEvent, MessageInputEvent
 from rtgbot.utils import Symbols
 
 
-class Text(Component):
+class Text(Component, explicit_state=True):
     @register_props
     def __init__(self, text='', end='\n', trim_spaces=False, **kwargs):
         super().__init__(**kwargs)
@@ -25,9 +25,10 @@ class Text(Component):
         return text
 
 
-class Button(Component):
+class Button(Component, explicit_state=True):
     @register_props
-    def __init__(self, on_click: tp.Callable[[ButtonClickEvent], tp.Awaitable] = None, url='', **kwargs):
+    def __init__(self, on_click: tp.Callable[[ButtonClickEvent], tp.Awaitable] = None, url='',
+                 toast: str = None, show_alert=False, defer_ack=False, **kwargs):
         super().__init__(**kwargs)
 
     def render_text(self):
@@ -49,6 +50,9 @@ class Button(Component):
             text=text,
             url=self.props.url,
             callback=self.props.on_click,
+            toast=self.props.toast,
+            show_alert=self.props.show_alert,
+            defer_ack=self.props.defer_ack,
         )]]
 
     async def on_event(self, event: ButtonClickEvent):
@@ -56,7 +60,7 @@ class Button(Component):
             await self.props.on_click(event)
 
 
-class MessageInput(Component):
+class MessageInput(Component, explicit_state=True):
     @register_props
     def __init__(self,
                  content_types: tp.Union[tp.Sequence[str], str] = ContentType.ANY,
@@ -76,7 +80,7 @@ class MessageInput(Component):
             await self.props.on_input(event)
 
 
-class StaticMedia(Component):
+class StaticMedia(Component, explicit_state=True):
     @register_props
     def __init__(self,
                  url: str = None,
@@ -97,7 +101,7 @@ class StaticMedia(Component):
         )]
 
 
-class BadComponent(Component):
+class BadComponent(Component, explicit_state=True):
     @register_props
     def __init__(self, info=''):
         super().__init__()
@@ -107,7 +111,7 @@ class BadComponent(Component):
         return f"{{ bad component: {info} }}\n"
 
 
-class ExceptionComponent(Component):
+class ExceptionComponent(Component, explicit_state=True):
     @register_props
     def __init__(self, e: Exception):
         super().__init__()
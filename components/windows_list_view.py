@@ -1,6 +1,7 @@
 import inspect
 import typing
 
+from rtgbot.base import state
 from rtgbot.components.base import WindowsGroup, WindowChildren, Window
 from rtgbot.components.for_each import For
 from rtgbot.components.paginator import Paginator
@@ -8,6 +9,8 @@ from rtgbot.decorators import register_props
 
 
 class WindowsListView(WindowsGroup):
+    page = state(1)
+
     @register_props
     def __init__(self,
                  items_getter, item_builder,
@@ -24,7 +27,6 @@ class WindowsListView(WindowsGroup):
             if page:
                 self.page = page
 
-        self.page = 1
         self.rct.watch(lambda: self.props.page, watch_page, immediate=True)
 
     async def render(self):
@@ -36,6 +36,9 @@ class ButtonElement(DOMElement):
     text: str = ""
     url: str = ""
     callback: tp.Callable = None
+    toast: str = None
+    show_alert: bool = False
+    defer_ack: bool = False
     button_id: str = field(init=False)
 
     def __post_init__(self):
@@ -83,36 +86,37 @@ class MessageElement(DOMElement):
 
     key: str = ''
 
+    # content fingerprints, computed once when the message is built and compared by the DOM diff
+    media_content: tp.Tuple = field(init=False, repr=False, compare=False)
+    kbd_content: tp.Tuple = field(init=False, repr=False, compare=False)
+    media_hash: int = field(init=False, repr=False, compare=False)
+    text_hash: int = field(init=False, repr=False, compare=False)
+    kbd_hash: int = field(init=False, repr=False, compare=False)
+
     def __post_init__(self):
         self.key = self.tree_node.rendered_chained_key
 
-    def compare_media(self, other: MessageElement):
-        if len(self.media) != len(other.media):
-            return False
+        self.media_content = tuple(media.url or media.path for media in self.media)
+        self.kbd_content = tuple((button.text, button.url, button.tree_node.rendered_chained_key)
+                                 for button in rtgbot.utils.unpack_kbd_buttons(self.keyboard))
 
-        for i in range(0, len(self.media)):
-            if self.media[i] != other.media[i]:
-                return False
+        self.media_hash = hash(self.media_content)
+        self.text_hash = hash(self.text)
+        self.kbd_hash = hash(self.kbd_content)
 
-        return True
+    def compare_media(self, other: MessageElement):
+        return self.media_hash == other.media_hash and self.media_content == other.media_content
 
     def compare_text(self, other: MessageElement):
-        return self.text == other.text
+        return self.text_hash == other.text_hash and self.text == other.text
 
     def compare_kbd(self, other: MessageElement):
-        kbd1 = rtgbot.utils.unpack_kbd_buttons(self.keyboard)
-        kbd2 = rtgbot.utils.unpack_kbd_buttons(other.keyboard)
-
-        if len(kbd1) != len(kbd2):
-            return False
-
-        for i in range(0, len(kbd1)):
-            if kbd1[i] != kbd2[i]:
-                return False
-
-        return True
+        return self.kbd_hash == other.kbd_hash and self.kbd_content == other.kbd_content
 
     def edit_cost(self, other: MessageElement):
+        if self is other:
+            return 0
+
         m = not self.compare_media(other) and len(other.media) or 0
         t = not self.compare_text(other)
         k = not self.compare_kbd(other)
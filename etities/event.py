@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import logging
+import time
 import typing as tp
 from dataclasses import dataclass, field
 
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery
 
 import rtgbot
 
@@ -26,11 +28,47 @@ class Event:
         return self.name
 
 
+class CallbackAck:
+    def __init__(self, callback_query: CallbackQuery, latency_stats: rtgbot.latency_stats.LatencyStats = None):
+        self.callback_query = callback_query
+        self.latency_stats = latency_stats
+
+        self.received_at = time.monotonic()
+        self.is_answered = False
+
+    async def answer(self, text: str = None, show_alert: bool = False) -> bool:
+        # a callback query can be answered only once, later answers are dropped
+        if self.is_answered:
+            return False
+        self.is_answered = True
+
+        try:
+            await self.callback_query.answer(text=text, show_alert=show_alert)
+        except Exception:
+            logging.warning("failed to answer callback query")
+            return False
+
+        if self.latency_stats:
+            self.latency_stats.add(time.monotonic() - self.received_at)
+        return True
+
+
 @dataclass
 class ButtonClickEvent(Event):
+    ack: CallbackAck = None
+
     def __post_init__(self):
         self.name = "click"
 
+    @property
+    def callback_query(self) -> tp.Optional[CallbackQuery]:
+        return self.ack.callback_query if self.ack else None
+
+    async def toast(self, text: str, show_alert: bool = False) -> bool:
+        if self.ack is None:
+            return False
+        return await self.ack.answer(text, show_alert)
+
     def __str__(self):
         return f"click {self.dom_element.text}"
 
@@ -38,9 +76,13 @@ class ButtonClickEvent(Event):
 @dataclass
 class MessageInputEvent(Event):
     tg_message: Message = None
+    # all messages of a coalesced burst, e.g. an album
+    tg_messages: tp.List[Message] = field(default_factory=list)
 
     def __post_init__(self):
         self.name = "input"
+        if self.tg_message is not None and not self.tg_messages:
+            self.tg_messages = [self.tg_message]
 
 
 @dataclass
@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+import typing as tp
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -6,3 +7,15 @@ class TgMessageInfo:
     message_id: int
     has_media: bool
     update_counter: int = 0
+
+
+@dataclass
+class TgMessageInfoChangeset:
+    # applied in order: remove_all, removes, rekeys, adds
+    remove_all: bool = False
+    removes: tp.List[int] = field(default_factory=list)
+    rekeys: tp.List[tp.Tuple[str, TgMessageInfo]] = field(default_factory=list)
+    adds: tp.List[tp.Tuple[str, TgMessageInfo]] = field(default_factory=list)
+
+    def __bool__(self):
+        return self.remove_all or bool(self.removes) or bool(self.rekeys) or bool(self.adds)
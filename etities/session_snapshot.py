@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import hashlib
+import typing as tp
+from dataclasses import dataclass, field
+
+import rtgbot
+
+
+@dataclass
+class SessionSnapshot:
+    # navigation stack: (screen factory, screen states), the start screen has no factory
+    navigation: tp.List[tp.Tuple[tp.Optional[tp.Callable], tp.List]] = field(default_factory=list)
+    # node chained key -> (node type name, reactive state values)
+    states: tp.Dict[str, tp.Tuple[str, tp.Dict[str, tp.Any]]] = field(default_factory=dict)
+    # (message key, content digest, media) of the last rendered DOM
+    dom: tp.List[tp.Tuple[str, bytes, tp.Tuple]] = field(default_factory=list)
+
+
+def message_digest(message: rtgbot.etities.dom.MessageElement) -> bytes:
+    content = (
+        message.text,
+        [(button.text, button.url, button.button_id) for button in rtgbot.utils.unpack_kbd_buttons(message.keyboard)],
+        [media.url or media.path for media in message.media],
+    )
+    return hashlib.blake2b(repr(content).encode(), digest_size=8).digest()
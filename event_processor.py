@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 import logging
 import time
 import typing as tp
@@ -8,7 +9,7 @@ from aiogram.types import Message
 
 import rtgbot.base
 from rtgbot.etities.dom import DOM, ButtonElement, InputElement, MessageElement
-from rtgbot.etities.event import Event, CustomEvent, MessageInputEvent, ButtonClickEvent
+from rtgbot.etities.event import Event, CustomEvent, MessageInputEvent, ButtonClickEvent, CallbackAck
 from rtgbot.utils import unpack_kbd_buttons
 
 
@@ -24,6 +25,9 @@ class EventProcessor:
         self.button_elements: tp.Dict[str, ButtonElement] = {}
         self.input_elements: tp.List[InputElement] = []
 
+        self._batch_depth = 0
+        self._batched_nodes: tp.Dict[rtgbot.base.ComponentTreeNode, None] = {}
+
     def start(self):
         self._event_handler_task = asyncio.create_task(self._event_handler())
 
@@ -34,23 +38,27 @@ class EventProcessor:
         except AttributeError:
             pass
 
-    def push_button_click(self, button_id: str):
+    def push_button_click(self, button_id: str, ack: CallbackAck = None) -> tp.Optional[ButtonClickEvent]:
         try:
             button_element = self.button_elements[button_id]
             button_node = button_element.tree_node
 
-            event = ButtonClickEvent(sender=button_node, dom_element=button_element)
+            event = ButtonClickEvent(sender=button_node, dom_element=button_element, ack=ack)
             self.event_queue.put_nowait(event)
-            return True
+            return event
         except KeyError:
             logging.warning("invalid button id")
-            return False
+            return None
 
     def push_message_input(self, message: Message):
+        return self.push_message_inputs([message])
+
+    def push_message_inputs(self, messages: tp.List[Message]):
         for input_element in self.input_elements:
             input_node = input_element.tree_node
 
-            event = MessageInputEvent(sender=input_node, dom_element=input_element, tg_message=message)
+            event = MessageInputEvent(sender=input_node, dom_element=input_element,
+                                      tg_message=messages[0], tg_messages=messages)
             self.event_queue.put_nowait(event)
             return True
         return False
@@ -63,7 +71,24 @@ class EventProcessor:
         self.event_queue.put_nowait(event)
 
     def push_node_modification(self, node: rtgbot.base.ComponentTreeNode):
-        self.event_queue.put_nowait(self.NodeModification(node))
+        if self._batch_depth:
+            self._batched_nodes[node] = None
+        else:
+            self.event_queue.put_nowait(self.NodeModification(node))
+
+    @contextlib.contextmanager
+    def batch(self):
+        # node modifications inside are queued once per node when the outermost batch exits
+        self._batch_depth += 1
+        try:
+            yield
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                nodes = self._batched_nodes
+                self._batched_nodes = {}
+                for node in nodes:
+                    self.event_queue.put_nowait(self.NodeModification(node))
 
     def register_dom_callbacks(self, dom: DOM):
         self.button_elements.clear()
@@ -105,6 +130,10 @@ class EventProcessor:
 
                     await self._propagate_event(event)
 
+                    # deferred acks that no handler answered are released here
+                    if isinstance(event, ButtonClickEvent) and event.ack:
+                        await event.ack.answer()
+
                 if self.event_queue.empty():
                     break
 
@@ -121,10 +150,11 @@ class EventProcessor:
     async def _propagate_event(self, event: Event):
         node = event.sender
 
-        while node and event.should_propagate:
-            try:
-                await node.on_event(event)
-            except Exception:
-                logging.exception(f"Exception occurred while processing event:")
+        with self.batch():
+            while node and event.should_propagate:
+                try:
+                    await node.on_event(event)
+                except Exception:
+                    logging.exception(f"Exception occurred while processing event:")
 
-            node = node._render_data.parent
+                node = node._render_data.parent
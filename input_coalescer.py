@@ -0,0 +1,48 @@
+import asyncio
+import time
+import typing as tp
+
+from aiogram.types import Message
+
+
+class InputCoalescer:
+    def __init__(self, on_flush: tp.Callable[[tp.List[Message]], tp.Any], window: float = 0.5, burst_gap: float = 0.1):
+        self.on_flush = on_flush
+        self.window = window
+        self.burst_gap = burst_gap
+
+        self._batch: tp.List[Message] = []
+        self._flush_handle: tp.Optional[asyncio.TimerHandle] = None
+        self._last_input_at = -float('inf')
+
+    def push(self, message: Message):
+        now = time.monotonic()
+        is_burst = len(self._batch) > 0 or self._is_burst_message(message) or now - self._last_input_at < self.burst_gap
+        self._last_input_at = now
+
+        # a single message is delivered right away, a burst is collected for a short window
+        if not is_burst or self.window <= 0:
+            self.on_flush([message])
+            return
+
+        self._batch.append(message)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self):
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch = self._batch
+        self._batch = []
+
+        if batch:
+            self.on_flush(batch)
+
+    @staticmethod
+    def _is_burst_message(message: Message):
+        # albums arrive as several messages, forwards usually come in groups too
+        return message.media_group_id is not None or \
+            getattr(message, 'forward_origin', None) is not None or \
+            getattr(message, 'forward_date', None) is not None
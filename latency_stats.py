@@ -0,0 +1,38 @@
+import typing as tp
+from collections import deque
+
+
+class LatencyStats:
+    def __init__(self, window: int = 1000):
+        # percentiles are taken over the most recent samples, totals over the whole lifetime
+        self.samples: tp.Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, latency: float):
+        self.samples.append(latency)
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.
+
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+    def summary(self) -> tp.Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
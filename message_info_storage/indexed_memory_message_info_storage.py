@@ -0,0 +1,75 @@
+import typing as tp
+
+from collections import defaultdict
+
+from rtgbot.etities.message_info import TgMessageInfo, TgMessageInfoChangeset
+from rtgbot.message_info_storage.message_info_storage import TgMessageInfoStorage
+
+
+class ChatMessagesIndex:
+    def __init__(self):
+        # message_id -> (message_key, message_info), in the order messages were added
+        self.messages: tp.Dict[int, tp.Tuple[str, TgMessageInfo]] = {}
+        self.message_ids: tp.Dict[str, int] = {}
+
+    def get(self, message_key: str):
+        return self.messages[self.message_ids[message_key]][1]
+
+    def add(self, message_key: str, message_info: TgMessageInfo):
+        message_id = message_info.message_id
+
+        self.remove(message_id)
+        self.messages[message_id] = (message_key, message_info)
+        self.message_ids[message_key] = message_id
+
+    def apply(self, changeset: TgMessageInfoChangeset):
+        if changeset.remove_all:
+            self.clear()
+        for message_id in changeset.removes:
+            self.remove(message_id)
+        for message_key, message_info in changeset.rekeys:
+            self.add(message_key, message_info)
+        for message_key, message_info in changeset.adds:
+            self.add(message_key, message_info)
+
+    def remove(self, message_id: int):
+        item = self.messages.pop(message_id, None)
+        if item is None:
+            return
+
+        # the key may already point to another message that took it over
+        message_key = item[0]
+        if self.message_ids.get(message_key) == message_id:
+            del self.message_ids[message_key]
+
+    def clear(self):
+        self.messages.clear()
+        self.message_ids.clear()
+
+
+class IndexedMemoryTgMessageInfoStorage(TgMessageInfoStorage):
+    def __init__(self):
+        self.user_messages: tp.Dict[int, ChatMessagesIndex] = defaultdict(ChatMessagesIndex)
+
+    async def get(self, chat_id: int, message_key: str):
+        return self.user_messages[chat_id].get(message_key)
+
+    async def get_all(self, chat_id: int):
+        return [item[1] for item in self.user_messages[chat_id].messages.values()]
+
+    async def add(self, chat_id: int, message_key: str, message_info: TgMessageInfo):
+        self.user_messages[chat_id].add(message_key, message_info)
+
+    async def remove(self, chat_id: int, message_id: int):
+        self.user_messages[chat_id].remove(message_id)
+
+    async def remove_all(self, chat_id: int):
+        self.user_messages.pop(chat_id, None)
+
+    async def get_many(self, chat_id: int, message_keys: tp.Iterable[str]):
+        chat = self.user_messages[chat_id]
+        return {message_key: chat.messages[chat.message_ids[message_key]][1]
+                for message_key in message_keys if message_key in chat.message_ids}
+
+    async def apply(self, chat_id: int, changeset: TgMessageInfoChangeset):
+        self.user_messages[chat_id].apply(changeset)
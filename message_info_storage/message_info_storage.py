@@ -1,6 +1,7 @@
+import typing as tp
 from abc import ABC
 
-from rtgbot.etities.message_info import TgMessageInfo
+from rtgbot.etities.message_info import TgMessageInfo, TgMessageInfoChangeset
 
 
 class TgMessageInfoStorage(ABC):
@@ -18,3 +19,30 @@ class TgMessageInfoStorage(ABC):
 
     async def remove_all(self, chat_id: int):
         raise NotImplementedError
+
+    async def get_many(self, chat_id: int, message_keys: tp.Iterable[str]) -> tp.Dict[str, TgMessageInfo]:
+        # missing keys are left out of the result
+        message_infos = {}
+        for message_key in message_keys:
+            try:
+                message_infos[message_key] = await self.get(chat_id, message_key)
+            except (KeyError, IndexError):
+                pass
+        return message_infos
+
+    async def apply(self, chat_id: int, changeset: TgMessageInfoChangeset):
+        if changeset.remove_all:
+            await self.remove_all(chat_id)
+        for message_id in changeset.removes:
+            await self.remove(chat_id, message_id)
+        for message_key, message_info in changeset.rekeys:
+            await self.remove(chat_id, message_info.message_id)
+            await self.add(chat_id, message_key, message_info)
+        for message_key, message_info in changeset.adds:
+            await self.add(chat_id, message_key, message_info)
+
+    async def flush(self):
+        pass
+
+    async def close(self):
+        pass
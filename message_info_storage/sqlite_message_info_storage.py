@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import sqlite3
+import typing as tp
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from rtgbot.etities.message_info import TgMessageInfo, TgMessageInfoChangeset
+from rtgbot.message_info_storage.indexed_memory_message_info_storage import ChatMessagesIndex
+from rtgbot.message_info_storage.message_info_storage import TgMessageInfoStorage
+
+
+class SqliteTgMessageInfoStorage(TgMessageInfoStorage):
+    _create_table_sql = '''
+        CREATE TABLE IF NOT EXISTS tg_messages (
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            message_key TEXT NOT NULL,
+            has_media INTEGER NOT NULL,
+            update_counter INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (chat_id, message_id)
+        )
+    '''
+    _select_chat_sql = '''
+        SELECT message_id, message_key, has_media, update_counter FROM tg_messages WHERE chat_id = ? ORDER BY seq
+    '''
+    _insert_sql = 'INSERT OR REPLACE INTO tg_messages VALUES (?, ?, ?, ?, ?, ?)'
+    _delete_sql = 'DELETE FROM tg_messages WHERE chat_id = ? AND message_id = ?'
+    _delete_chat_sql = 'DELETE FROM tg_messages WHERE chat_id = ?'
+
+    def __init__(self, path: str, flush_interval: float = 0.05, max_cached_chats: int = 10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_cached_chats = max_cached_chats
+
+        # all database work runs in one thread, so loads and flushes are applied in submission order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-message-info")
+        self._connection: tp.Optional[sqlite3.Connection] = None
+        self._seq = None
+
+        self._chats: tp.OrderedDict[int, ChatMessagesIndex] = OrderedDict()
+        self._loading_chats: tp.Dict[int, asyncio.Future] = {}
+
+        self._pending_writes: tp.List[tp.Tuple[str, tuple]] = []
+        self._dirty_chats: tp.Set[int] = set()
+        self._flush_task: tp.Optional[asyncio.Task] = None
+
+    async def get(self, chat_id: int, message_key: str):
+        return (await self._get_chat(chat_id)).get(message_key)
+
+    async def get_all(self, chat_id: int):
+        return [item[1] for item in (await self._get_chat(chat_id)).messages.values()]
+
+    async def add(self, chat_id: int, message_key: str, message_info: TgMessageInfo):
+        (await self._get_chat(chat_id)).add(message_key, message_info)
+        self._write_add(chat_id, message_key, message_info)
+
+    async def remove(self, chat_id: int, message_id: int):
+        (await self._get_chat(chat_id)).remove(message_id)
+        self._write(chat_id, self._delete_sql, (chat_id, message_id))
+
+    async def remove_all(self, chat_id: int):
+        (await self._get_chat(chat_id)).clear()
+        self._write(chat_id, self._delete_chat_sql, (chat_id,))
+
+    async def get_many(self, chat_id: int, message_keys: tp.Iterable[str]):
+        chat = await self._get_chat(chat_id)
+        return {message_key: chat.messages[chat.message_ids[message_key]][1]
+                for message_key in message_keys if message_key in chat.message_ids}
+
+    async def apply(self, chat_id: int, changeset: TgMessageInfoChangeset):
+        (await self._get_chat(chat_id)).apply(changeset)
+
+        if changeset.remove_all:
+            self._write(chat_id, self._delete_chat_sql, (chat_id,))
+        for message_id in changeset.removes:
+            self._write(chat_id, self._delete_sql, (chat_id, message_id))
+        # the message id is the primary key, so a re-key is just an upsert
+        for message_key, message_info in changeset.rekeys + changeset.adds:
+            self._write_add(chat_id, message_key, message_info)
+
+    async def flush(self):
+        if self._flush_task and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+
+        writes = self._pending_writes
+        self._pending_writes = []
+        self._dirty_chats.clear()
+
+        if writes:
+            try:
+                await self._run(self._execute_writes, writes)
+            except Exception:
+                logging.exception("Exception while writing message info:")
+
+        self._evict_chats()
+
+    async def close(self):
+        await self.flush()
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_connection)
+        self._executor.shutdown(wait=False)
+
+    async def _get_chat(self, chat_id: int) -> ChatMessagesIndex:
+        try:
+            chat = self._chats[chat_id]
+            self._chats.move_to_end(chat_id)
+            return chat
+        except KeyError:
+            pass
+
+        # concurrent callers of a chat that is not loaded yet share one read
+        future = self._loading_chats.get(chat_id)
+        if future is None:
+            future = asyncio.ensure_future(self._load_chat(chat_id))
+            self._loading_chats[chat_id] = future
+
+        return await future
+
+    async def _load_chat(self, chat_id: int) -> ChatMessagesIndex:
+        try:
+            rows = await self._run(self._select_chat, chat_id)
+
+            chat = ChatMessagesIndex()
+            for message_id, message_key, has_media, update_counter in rows:
+                chat.add(message_key, TgMessageInfo(message_id, bool(has_media), update_counter))
+
+            self._chats[chat_id] = chat
+            return chat
+        finally:
+            self._loading_chats.pop(chat_id, None)
+
+    def _write_add(self, chat_id: int, message_key: str, message_info: TgMessageInfo):
+        self._seq += 1
+        self._write(chat_id, self._insert_sql, (chat_id, message_info.message_id, message_key,
+                                                message_info.has_media, message_info.update_counter, self._seq))
+
+    def _write(self, chat_id: int, sql: str, params: tuple):
+        self._pending_writes.append((sql, params))
+        self._dirty_chats.add(chat_id)
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    def _evict_chats(self):
+        if len(self._chats) <= self.max_cached_chats:
+            return
+
+        for chat_id in list(self._chats.keys()):
+            if len(self._chats) <= self.max_cached_chats:
+                break
+            # chats with unflushed writes stay cached, a reload would miss them
+            if chat_id not in self._dirty_chats:
+                self._chats.pop(chat_id)
+
+    async def _run(self, func: tp.Callable, *args):
+        if self._connection is None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._open_connection)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _open_connection(self):
+        if self._connection is not None:
+            return
+
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(self._create_table_sql)
+        connection.commit()
+
+        self._seq = connection.execute('SELECT COALESCE(MAX(seq), 0) FROM tg_messages').fetchone()[0]
+        self._connection = connection
+
+    def _close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _select_chat(self, chat_id: int):
+        return self._connection.execute(self._select_chat_sql, (chat_id,)).fetchall()
+
+    def _execute_writes(self, writes: tp.List[tp.Tuple[str, tuple]]):
+        with self._connection:
+            for sql, params in writes:
+                self._connection.execute(sql, params)
@@ -2,14 +2,19 @@ import asyncio
 import logging
 import time
 import typing as tp
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 
 from rtgbot.etities.dom import DOM, DOMUpdate, MessageElement, DOMMessageUpdate
-from rtgbot.etities.message_info import TgMessageInfo
+from rtgbot.etities.message_info import TgMessageInfo, TgMessageInfoChangeset
+from rtgbot.latency_stats import LatencyStats
 from rtgbot.message_info_storage.message_info_storage import TgMessageInfoStorage
+from rtgbot.rate_limiter import RateLimiter, RateLimits
+from rtgbot.renderer import Renderer
 from rtgbot.utils import Symbols, cond_kw
 
 
@@ -23,47 +28,237 @@ class TgMessageData:
     parse_mode: str
 
 
+@dataclass
+class ScreenTask:
+    chat_id: int
+    dom: DOM
+    # reset the whole screen when there is no update
+    dom_update: tp.Optional[DOMUpdate] = None
+    prev_dom: tp.Optional[DOM] = None
+    # messages edited even if unchanged, coalesced tasks keep the keys of all merged ones
+    force_update_message_keys: tp.FrozenSet[str] = frozenset()
+    # coalesced tasks keep the time of the earliest one
+    scheduled_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def is_reset(self):
+        return self.dom_update is None
+
+
+@dataclass
+class LaneCounters:
+    processed_count: int = 0
+    coalesced_count: int = 0
+    max_depth: int = 0
+
+
+@dataclass
+class ChatLane:
+    chat_id: int
+    # kept by the sender, so they outlive the lane once its chat goes idle
+    counters: LaneCounters
+    tasks: tp.Deque[ScreenTask] = field(default_factory=deque)
+    is_scheduled: bool = False
+
+    @property
+    def depth(self):
+        return len(self.tasks)
+
+
+@dataclass
+class LaneStats:
+    chat_id: int
+    depth: int
+    max_depth: int
+    processed_count: int
+    coalesced_count: int
+
+
 class MessageSender:
-    def __init__(self, bot: Bot, message_info_storage: TgMessageInfoStorage):
+    def __init__(self, bot: Bot, message_info_storage: TgMessageInfoStorage, max_workers: int = 16,
+                 rate_limits: RateLimits = None, deletion_window: float = 1.):
         self.bot = bot
-        self.task_queue = asyncio.Queue()
+        self.rate_limiter = RateLimiter(rate_limits)
+
+        # tasks of one chat are applied strictly in order, different chats are served concurrently
+        self.lanes: tp.Dict[int, ChatLane] = {}
+        self.lane_counters: tp.Dict[int, LaneCounters] = {}
+        self.ready_queue = asyncio.Queue()
+        self.max_workers = max_workers
 
         self.message_info_storage = message_info_storage
         self.default_image_url = 'https://liftlearning.com/wp-content/uploads/2020/09/default-image.png'
 
+        self._workers: tp.List[asyncio.Task] = []
+        self.render_latency = LatencyStats()
+
+        # message ids are collected per chat and deleted in bulk once the window is over
+        self.deletion_window = deletion_window
+        self.deletion_batch_size = 100
+        self._pending_deletions: tp.Dict[int, tp.List[int]] = {}
+        self._deletion_handles: tp.Dict[int, asyncio.TimerHandle] = {}
+        self._deletion_tasks: tp.Set[asyncio.Task] = set()
+
     def start(self):
-        self._task_handler_task = asyncio.create_task(self._task_handler())
+        self._workers = [asyncio.create_task(self._lane_worker()) for _ in range(self.max_workers)]
 
     async def stop(self):
         try:
-            await self.task_queue.join()
-            self._task_handler_task.cancel()
+            await self.ready_queue.join()
+            for worker in self._workers:
+                worker.cancel()
         except:
             pass
 
+        for chat_id in list(self._pending_deletions):
+            self._flush_deletions(chat_id)
+        if self._deletion_tasks:
+            await asyncio.gather(*self._deletion_tasks, return_exceptions=True)
+
+        await self.message_info_storage.close()
+
     def schedule_screen_reset(self, chat_id: int, dom: DOM):
         # logging.info("schedule reset")
-        self.task_queue.put_nowait(self._reset_screen(chat_id, dom))
+        self._schedule(ScreenTask(chat_id=chat_id, dom=dom))
 
-    def schedule_screen_update(self, chat_id: int, dom: DOM, dom_update: DOMUpdate):
+    def schedule_screen_update(self, chat_id: int, dom: DOM, dom_update: DOMUpdate,
+                               prev_dom: DOM = None, force_update_message_key: str = None):
         # logging.info("schedule update")
-        self.task_queue.put_nowait(self._update_screen(chat_id, dom, dom_update))
+        force_update_message_keys = force_update_message_key and frozenset((force_update_message_key,)) or frozenset()
+        self._schedule(ScreenTask(chat_id=chat_id, dom=dom, dom_update=dom_update,
+                                  prev_dom=prev_dom, force_update_message_keys=force_update_message_keys))
+
+    def get_lane_stats(self) -> tp.List[LaneStats]:
+        # every chat served since the last reset_lane_stats(), idle ones with depth 0
+        stats = []
+        for chat_id, counters in self.lane_counters.items():
+            lane = self.lanes.get(chat_id)
+            stats.append(LaneStats(chat_id=chat_id, depth=lane and lane.depth or 0, max_depth=counters.max_depth,
+                                   processed_count=counters.processed_count,
+                                   coalesced_count=counters.coalesced_count))
+        return stats
+
+    def reset_lane_stats(self):
+        self.lane_counters.clear()
+        for lane in self.lanes.values():
+            lane.counters = self.lane_counters[lane.chat_id] = LaneCounters()
+
+    @property
+    def queue_depth(self):
+        return sum(lane.depth for lane in self.lanes.values())
+
+    def _schedule(self, task: ScreenTask):
+        chat_id = task.chat_id
+
+        lane = self.lanes.get(chat_id)
+        if lane is None:
+            counters = self.lane_counters.get(chat_id)
+            if counters is None:
+                counters = self.lane_counters[chat_id] = LaneCounters()
+            lane = self.lanes[chat_id] = ChatLane(chat_id, counters)
+
+        # only the latest screen matters: replace the pending task instead of queueing another one
+        if lane.tasks:
+            lane.tasks[-1] = self._coalesce_screen_tasks(lane.tasks[-1], task)
+            lane.counters.coalesced_count += 1
+            return
+
+        lane.tasks.append(task)
+        lane.counters.max_depth = max(lane.counters.max_depth, lane.depth)
+
+        if not lane.is_scheduled:
+            lane.is_scheduled = True
+            self.ready_queue.put_nowait(lane)
+
+    def schedule_message_deletion(self, chat_id: int, message_id: int):
+        message_ids = self._pending_deletions.setdefault(chat_id, [])
+        message_ids.append(message_id)
+
+        if len(message_ids) >= self.deletion_batch_size:
+            self._flush_deletions(chat_id)
+        elif chat_id not in self._deletion_handles:
+            self._deletion_handles[chat_id] = asyncio.get_running_loop().call_later(
+                self.deletion_window, self._flush_deletions, chat_id)
+
+    def _flush_deletions(self, chat_id: int):
+        handle = self._deletion_handles.pop(chat_id, None)
+        if handle:
+            handle.cancel()
+
+        message_ids = self._pending_deletions.pop(chat_id, None)
+        if not message_ids:
+            return
+
+        task = asyncio.create_task(self._delete_messages(chat_id, message_ids))
+        self._deletion_tasks.add(task)
+        task.add_done_callback(self._deletion_tasks.discard)
+
+    async def _delete_messages(self, chat_id: int, message_ids: tp.List[int]):
+        for i in range(0, len(message_ids), self.deletion_batch_size):
+            try:
+                await self.rate_limiter.call(self.bot.delete_messages, chat_id=chat_id,
+                                             message_ids=message_ids[i:i + self.deletion_batch_size])
+            except TelegramBadRequest:
+                # messages that are already gone or too old to delete are skipped
+                pass
+            except Exception:
+                logging.exception("Exception in message sender:")
 
-    async def _task_handler(self):
+    async def _lane_worker(self):
         while True:
-            task = await self.task_queue.get()
-            await task
-            self.task_queue.task_done()
+            lane: ChatLane = await self.ready_queue.get()
+
+            # run one task per turn, so busy chats are served round-robin with quiet ones
+            task = lane.tasks.popleft()
+            try:
+                if task.is_reset:
+                    await self._reset_screen(task.chat_id, task.dom)
+                else:
+                    await self._update_screen(task.chat_id, task.dom, task.dom_update)
+                self.render_latency.add(time.monotonic() - task.scheduled_at)
+            except Exception:
+                logging.exception("Exception in message sender:")
+            lane.counters.processed_count += 1
+
+            if lane.tasks:
+                self.ready_queue.put_nowait(lane)
+            else:
+                lane.is_scheduled = False
+                self.lanes.pop(lane.chat_id, None)
+
+            self.ready_queue.task_done()
+
+    def _coalesce_screen_tasks(self, pending: ScreenTask, task: ScreenTask) -> ScreenTask:
+        if pending.is_reset or task.is_reset or pending.prev_dom is None:
+            return ScreenTask(chat_id=task.chat_id, dom=task.dom, scheduled_at=pending.scheduled_at)
+
+        force_update_message_keys = pending.force_update_message_keys | task.force_update_message_keys
+
+        # pending task has not started yet, so its previous DOM is the last one delivered to the chat
+        dom_update = Renderer.calculate_dom_update(pending.prev_dom, task.dom)
+        for update in dom_update:
+            if update.action == DOMMessageUpdate.Action.keep and update.old_message.key in force_update_message_keys:
+                update.action = DOMMessageUpdate.Action.update
+
+        return ScreenTask(
+            chat_id=task.chat_id,
+            dom=task.dom,
+            dom_update=dom_update,
+            prev_dom=pending.prev_dom,
+            force_update_message_keys=force_update_message_keys,
+            scheduled_at=pending.scheduled_at
+        )
 
     async def _reset_screen(self, chat_id: int, dom: DOM):
         # logging.info(f"reset screen, chat_id: {chat_id}")
 
+        changeset = TgMessageInfoChangeset(remove_all=True)
+
         async def send_messages():
             for message in dom:
-                await self._send_message(chat_id, message)
+                await self._send_message(chat_id, message, changeset)
 
         sent_messages = await self.message_info_storage.get_all(chat_id)
-        await self.message_info_storage.remove_all(chat_id)
 
         tasks = []
 
@@ -77,25 +272,33 @@ class MessageSender:
             except:
                 logging.exception("Exception in message sender:")
 
+        await self.message_info_storage.apply(chat_id, changeset)
+
     async def _update_screen(self, chat_id: int, dom: DOM, dom_update: DOMUpdate):
         # logging.info(f"update screen, chat_id: {chat_id}")
 
+        changeset = TgMessageInfoChangeset()
+
         async def send_messages():
             for update in dom_update:
                 if update.action == DOMMessageUpdate.Action.send:
-                    await self._send_message(chat_id, update.new_message)
+                    await self._send_message(chat_id, update.new_message, changeset)
 
         start = time.time()
 
+        message_infos = await self.message_info_storage.get_many(
+            chat_id, [update.old_message.key for update in dom_update if update.action != DOMMessageUpdate.Action.send]
+        )
+
         tasks = []
 
         tasks.append(send_messages())
 
         for update in dom_update:
             if update.action == DOMMessageUpdate.Action.keep or update.action == DOMMessageUpdate.Action.update:
-                tasks.append(self._update_message(chat_id, update))
+                tasks.append(self._update_message(chat_id, update, message_infos, changeset))
             elif update.action == DOMMessageUpdate.Action.delete:
-                tasks.append(self._delete_message(chat_id, update.old_message.key))
+                tasks.append(self._delete_message(chat_id, update.old_message.key, message_infos, changeset))
 
         failed = False
 
@@ -106,6 +309,8 @@ class MessageSender:
                 failed = True
                 logging.exception("Exception in message sender:")
 
+        await self.message_info_storage.apply(chat_id, changeset)
+
         if failed:
             await self._reset_screen(chat_id, dom)
 
@@ -144,11 +349,12 @@ class MessageSender:
             disable_notification=not message.enable_notification
         )
 
-    async def _send_message(self, chat_id: int, message: MessageElement):
+    async def _send_message(self, chat_id: int, message: MessageElement, changeset: TgMessageInfoChangeset):
         message_data = self._prepare_message_data(message, 0)
 
         if not message_data.media:
-            result_message = await self.bot.send_message(
+            result_message = await self.rate_limiter.call(
+                self.bot.send_message,
                 chat_id=chat_id,
                 text=message_data.text,
                 parse_mode=message_data.parse_mode,
@@ -159,7 +365,8 @@ class MessageSender:
                 disable_notification=message_data.disable_notification
             )
         else:
-            result_message = await self.bot.send_photo(
+            result_message = await self.rate_limiter.call(
+                self.bot.send_photo,
                 chat_id=chat_id,
                 photo=message_data.media,
                 caption=message_data.text,
@@ -170,11 +377,11 @@ class MessageSender:
                 disable_notification=message_data.disable_notification
             )
 
-        await self.message_info_storage.add(chat_id, message.key,
-                                            TgMessageInfo(result_message.message_id, message_data.media is not None))
+        changeset.adds.append((message.key, TgMessageInfo(result_message.message_id, message_data.media is not None)))
 
-    async def _update_message(self, chat_id: int, update: DOMMessageUpdate):
-        message_info: TgMessageInfo = await self.message_info_storage.get(chat_id, update.old_message.key)
+    async def _update_message(self, chat_id: int, update: DOMMessageUpdate,
+                              message_infos: tp.Dict[str, TgMessageInfo], changeset: TgMessageInfoChangeset):
+        message_info = message_infos[update.old_message.key]
 
         if update.action == DOMMessageUpdate.Action.update:
             message_id = message_info.message_id
@@ -196,7 +403,8 @@ class MessageSender:
                 message_data.media = self.default_image_url
 
             if diff_media:
-                await self.bot.edit_message_media(
+                await self.rate_limiter.call(
+                    self.bot.edit_message_media,
                     chat_id=chat_id,
                     message_id=message_id,
                     media=InputMediaPhoto(
@@ -209,7 +417,8 @@ class MessageSender:
                 )
             elif diff_text:
                 if not has_media:
-                    await self.bot.edit_message_text(
+                    await self.rate_limiter.call(
+                        self.bot.edit_message_text,
                         chat_id=chat_id,
                         message_id=message_id,
                         text=message_data.text,
@@ -220,7 +429,8 @@ class MessageSender:
                         disable_web_page_preview=message_data.disable_web_page_preview
                     )
                 else:
-                    await self.bot.edit_message_caption(
+                    await self.rate_limiter.call(
+                        self.bot.edit_message_caption,
                         chat_id=chat_id,
                         message_id=message_id,
                         caption=message_data.text,
@@ -230,7 +440,8 @@ class MessageSender:
                         ),
                     )
             elif diff_kbd:
-                await self.bot.edit_message_reply_markup(
+                await self.rate_limiter.call(
+                    self.bot.edit_message_reply_markup,
                     chat_id=chat_id,
                     message_id=message_id,
                     reply_markup=InlineKeyboardMarkup(
@@ -238,16 +449,18 @@ class MessageSender:
                     )
                 )
 
-        await self.message_info_storage.remove(chat_id, message_info.message_id)
-        await self.message_info_storage.add(chat_id, update.new_message.key, message_info)
+        if update.action == DOMMessageUpdate.Action.update or update.new_message.key != update.old_message.key:
+            changeset.rekeys.append((update.new_message.key, message_info))
 
-    async def _delete_message(self, chat_id: int, message_key: str):
-        message_info = await self.message_info_storage.get(chat_id, message_key)
+    async def _delete_message(self, chat_id: int, message_key: str,
+                              message_infos: tp.Dict[str, TgMessageInfo], changeset: TgMessageInfoChangeset):
+        message_info = message_infos[message_key]
         await self._delete_message_by_id(chat_id, message_info.message_id)
-        await self.message_info_storage.remove(chat_id, message_info.message_id)
+        changeset.removes.append(message_info.message_id)
 
     async def _delete_message_by_id(self, chat_id: int, message_id: int):
-        await self.bot.delete_message(
+        await self.rate_limiter.call(
+            self.bot.delete_message,
             chat_id=chat_id,
             message_id=message_id
         )
@@ -26,6 +26,8 @@ class Navigator:
         push_new = to is not None
         if push_new:
             screen = to()
+            # remembered so the stack can be rebuilt from a hibernated session
+            screen._navigation_factory = to
         else:
             screen = self._stack[-1][0]
 
@@ -109,3 +111,27 @@ class Navigator:
     def reset(self):
         while self.back():
             pass
+
+    def snapshot(self) -> tp.List[tp.Tuple[tp.Optional[tp.Callable], tp.List]]:
+        return [
+            (index > 0 and screen._navigation_factory or None, list(screen_states))
+            for index, (screen, screen_states) in enumerate(self._stack)
+        ]
+
+    def restore(self, stack: tp.List[tp.Tuple[tp.Optional[tp.Callable], tp.List]]):
+        restored_stack = []
+
+        for index, (factory, screen_states) in enumerate(stack):
+            if index == 0:
+                screen = self._stack[0][0]
+            else:
+                screen = factory()
+                screen._navigation_factory = factory
+
+            if screen_states:
+                screen.state = screen_states[-1]
+            restored_stack.append((screen, list(screen_states)))
+
+        if restored_stack:
+            self._stack = restored_stack
+            self._navigation_stack.invalidate()
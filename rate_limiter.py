@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+import typing as tp
+from dataclasses import dataclass
+
+from aiogram.exceptions import TelegramRetryAfter
+
+
+@dataclass
+class RateLimits:
+    # Bot API flood limits: ~30 requests/s per bot, short bursts in a private chat, 20 messages/min in a group
+    global_rate: float = 30.
+    global_burst: float = 30.
+    chat_rate: float = 3.
+    chat_burst: float = 10.
+    group_rate: float = 20. / 60.
+    group_burst: float = 5.
+    max_retries: int = 3
+
+
+@dataclass
+class RateLimiterStats:
+    calls: int = 0
+    throttled: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.parked_until = 0.
+
+    def reserve(self, now: float) -> float:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        # tokens may go negative: callers queue up behind each other and wait for their share
+        self.tokens -= 1
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.
+
+        return max(delay, self.parked_until - now)
+
+    def park(self, until: float):
+        self.parked_until = max(self.parked_until, until)
+
+    def is_idle(self, now: float):
+        return now >= self.parked_until and self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    def __init__(self, limits: RateLimits = None):
+        self.limits = limits or RateLimits()
+        self.stats = RateLimiterStats()
+
+        self._global_bucket = TokenBucket(self.limits.global_rate, self.limits.global_burst)
+        self._chat_buckets: tp.Dict[int, TokenBucket] = {}
+        self._group_buckets: tp.Dict[int, TokenBucket] = {}
+
+        self._prune_interval = 60.
+        self._pruned_at = time.monotonic()
+
+    async def call(self, method: tp.Callable[..., tp.Awaitable], chat_id: int, **kwargs):
+        attempt = 0
+
+        while True:
+            await self.acquire(chat_id)
+            self.stats.calls += 1
+
+            try:
+                return await method(chat_id=chat_id, **kwargs)
+            except TelegramRetryAfter as e:
+                if attempt >= self.limits.max_retries:
+                    self.stats.failed += 1
+                    raise
+
+                attempt += 1
+                self.stats.retried += 1
+                logging.warning(f"flood control in chat {chat_id}, retry in {e.retry_after} s")
+
+                # park only the affected chat, other lanes keep going
+                self.park(chat_id, e.retry_after)
+
+    async def acquire(self, chat_id: int):
+        now = time.monotonic()
+        self._prune(now)
+
+        buckets = [self._get_bucket(self._chat_buckets, chat_id, self.limits.chat_rate, self.limits.chat_burst)]
+        if chat_id < 0:
+            buckets.append(self._get_bucket(self._group_buckets, chat_id,
+                                            self.limits.group_rate, self.limits.group_burst))
+        buckets.append(self._global_bucket)
+
+        throttled = False
+
+        # take chat tokens first, so a throttled chat does not hold global capacity while it waits
+        for bucket in buckets:
+            delay = bucket.reserve(now)
+            if delay > 0:
+                throttled = True
+                await asyncio.sleep(delay)
+                now = time.monotonic()
+
+        if throttled:
+            self.stats.throttled += 1
+
+    def park(self, chat_id: int, retry_after: float):
+        until = time.monotonic() + retry_after
+        self._get_bucket(self._chat_buckets, chat_id, self.limits.chat_rate, self.limits.chat_burst).park(until)
+
+        if chat_id < 0:
+            self._get_bucket(self._group_buckets, chat_id,
+                             self.limits.group_rate, self.limits.group_burst).park(until)
+
+    def _get_bucket(self, buckets: tp.Dict[int, TokenBucket], chat_id: int, rate: float, capacity: float):
+        bucket = buckets.get(chat_id)
+        if bucket is None:
+            bucket = buckets[chat_id] = TokenBucket(rate, capacity)
+        return bucket
+
+    def _prune(self, now: float):
+        if now - self._pruned_at < self._prune_interval:
+            return
+        self._pruned_at = now
+
+        for buckets in (self._chat_buckets, self._group_buckets):
+            for chat_id in [chat_id for chat_id, bucket in buckets.items() if bucket.is_idle(now)]:
+                buckets.pop(chat_id)
@@ -12,7 +12,7 @@ class ReactivityManager:
     @dataclass
     class WatchedExpression:
         expr: tp.Callable[[], tp.Any]
-        deps: tp.List[str]
+        deps: tp.Set[str]
         value: tp.Any
         target: str = None
         callback: tp.Callable[[tp.Any, tp.Any], None | tp.Coroutine] = None
@@ -30,12 +30,16 @@ class ReactivityManager:
 
     def __init__(self, component):
         self._component = component
+        self._state_fields = getattr(type(component), '_state_fields', {})
 
         self._values: tp.Dict[str, ReactivityManager.ComponentValue] = {}
 
         self._is_recording_enabled = False
         self._recorded_reads = []
 
+        # computed values whose dependencies changed since they were last evaluated
+        self._stale_computed: tp.Set[str] = set()
+
     def computed(self, expr: tp.Callable[[], tp.Any]):
         try:
             watched_expr = self._evaluate_expression(expr)
@@ -55,25 +59,12 @@ class ReactivityManager:
             logging.exception("Exception occurred while creating watcher:")
 
     def _evaluate_expression(self, expr):
-        self._is_recording_enabled = True
-        self._recorded_reads = []
-
-        exception = None
-        value = None
-        try:
-            value = expr()
-        except Exception as e:
-            exception = e
-
-        self._is_recording_enabled = False
-
-        if exception is not None:
-            raise exception
+        value, deps = self._record_reads(expr)
 
         watched_expr = self.WatchedExpression(
             expr=expr,
             value=value,
-            deps=list(set(self._recorded_reads))
+            deps=deps
         )
 
         # register new watch
@@ -81,6 +72,96 @@ class ReactivityManager:
 
         return watched_expr
 
+    def _record_reads(self, expr):
+        # a stale computed value read by the expression is evaluated in between, so keep the outer recording
+        is_recording_enabled = self._is_recording_enabled
+        recorded_reads = self._recorded_reads
+
+        self._is_recording_enabled = True
+        self._recorded_reads = []
+
+        try:
+            value = expr()
+            deps = set(self._recorded_reads)
+        finally:
+            self._is_recording_enabled = is_recording_enabled
+            self._recorded_reads = recorded_reads
+
+        return value, deps
+
+    def _update_expression(self, watched_expr):
+        # re-evaluate in place, only the dependencies that changed are registered or unregistered
+        value, deps = self._record_reads(watched_expr.expr)
+
+        for key in watched_expr.deps - deps:
+            try:
+                self._values[key].dep_watchers.discard(watched_expr)
+            except KeyError:
+                pass
+        for key in deps - watched_expr.deps:
+            try:
+                self._values[key].dep_watchers.add(watched_expr)
+            except KeyError:
+                pass
+
+        watched_expr.deps = deps
+        watched_expr.value = value
+
+    def _update_computed(self, key):
+        self._stale_computed.discard(key)
+        component_val = self._values[key]
+
+        try:
+            self._update_expression(component_val.watched_expr)
+        except Exception:
+            logging.exception("Exception occurred while calling watcher expression:")
+            return component_val.curr
+
+        # the change was already reported by the dependencies
+        value = component_val.watched_expr.value
+        component_val.curr = value
+        component_val.prev = value
+        self._store_value(key, value)
+
+        return value
+
+    def _invalidate_computed(self, key):
+        if key in self._stale_computed:
+            return
+
+        component_val = self._values[key]
+
+        if any(dep_watcher.callback and not dep_watcher.target for dep_watcher in component_val.dep_watchers):
+            # watcher callbacks are called right away, so the value they watch is evaluated right away too
+            prev_value = component_val.curr
+            if self._update_computed(key) != prev_value:
+                self._propagate_change(component_val)
+        else:
+            self._stale_computed.add(key)
+            self._propagate_change(component_val)
+
+    def _propagate_change(self, component_val):
+        for dep_watcher in copy(component_val.dep_watchers):
+            if dep_watcher.target:
+                self._invalidate_computed(dep_watcher.target)
+            elif dep_watcher.callback:
+                try:
+                    prev_value = dep_watcher.value
+                    self._update_expression(dep_watcher)
+                    self._call_watcher_callback(dep_watcher.callback, dep_watcher.value, prev_value)
+                except Exception:
+                    logging.exception("Exception occurred while calling watcher expression:")
+            else:
+                # a computed value assigned to a plain attribute of a component with explicit state is not updated
+                self._unregister_watcher_deps(dep_watcher)
+
+    def _store_value(self, key, value):
+        if key in self._state_fields:
+            # bypass the state field descriptor, it is the one calling here
+            object.__getattribute__(self._component, '__dict__')[key] = value
+        else:
+            object.__setattr__(self._component, key, value)
+
     def _call_watcher_callback(self, callback, new_value, prev_value):
         if asyncio.iscoroutinefunction(callback):
             asyncio.create_task(callback(new_value, prev_value))
@@ -102,7 +183,7 @@ class ReactivityManager:
             value = watched_expr.value
 
         if not is_property:
-            object.__setattr__(self._component, key, value)
+            self._store_value(key, value)
 
         value_changed = True
 
@@ -116,6 +197,7 @@ class ReactivityManager:
             # unregister current watch
             if component_val.watched_expr:
                 self._unregister_watcher_deps(component_val.watched_expr)
+                self._stale_computed.discard(key)
 
             # set new watch
             component_val.watched_expr = watched_expr
@@ -127,20 +209,8 @@ class ReactivityManager:
             if is_property and len(component_val.dep_watchers) > 0:
                 pass
 
-            # propagate update
-            for dep_watcher in copy(component_val.dep_watchers):
-                try:
-                    new_watched_expr = self._evaluate_expression(dep_watcher.expr)
-                    new_watched_expr.target = dep_watcher.target
-                    new_watched_expr.callback = dep_watcher.callback
-
-                    if dep_watcher.target:
-                        setattr(self._component, dep_watcher.target, new_watched_expr)
-                    else:
-                        self._unregister_watcher_deps(dep_watcher)
-                        self._call_watcher_callback(dep_watcher.callback, new_watched_expr.value, dep_watcher.value)
-                except Exception:
-                    logging.exception("Exception occurred while calling watcher expression:")
+            # computed values are marked stale and evaluated when read, watcher callbacks are called now
+            self._propagate_change(component_val)
 
     def _record_value_read(self, key, is_property):
         if self._is_recording_enabled:
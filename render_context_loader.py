@@ -0,0 +1,138 @@
+import asyncio
+import time
+import typing as tp
+from dataclasses import dataclass
+
+from rtgbot.etities.user_info import UserInfo
+
+
+@dataclass
+class RenderContextLoaderStats:
+    loads: int = 0
+    hits: int = 0
+    batches: int = 0
+    provider_calls: int = 0
+    errors: int = 0
+
+
+class RenderContextLoader:
+    def __init__(self,
+                 provider: tp.Callable[[UserInfo], tp.Awaitable[tp.Dict]] = None,
+                 batch_provider: tp.Callable[[tp.List[UserInfo]], tp.Awaitable[tp.Dict[int, tp.Dict]]] = None,
+                 ttl: float = 5., batch_window: float = 0.005, max_batch_size: int = 100):
+        self.provider = provider
+        self.batch_provider = batch_provider
+        self.ttl = ttl
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self.stats = RenderContextLoaderStats()
+
+        self._cache: tp.Dict[int, tp.Tuple[float, tp.Dict]] = {}
+        self._loading: tp.Dict[int, asyncio.Future] = {}
+        self._batch: tp.Dict[int, UserInfo] = {}
+        self._batch_handle: tp.Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: tp.Set[asyncio.Task] = set()
+        self._pruned_at = time.monotonic()
+
+    @property
+    def is_enabled(self):
+        return self.provider is not None or self.batch_provider is not None
+
+    async def load(self, user_info: UserInfo) -> tp.Dict:
+        user_id = user_info.user_id
+        self.stats.loads += 1
+
+        cached = self._cache.get(user_id)
+        if cached is not None and cached[0] > time.monotonic():
+            self.stats.hits += 1
+            return cached[1]
+
+        # concurrent loads of one user share a single provider call
+        future = self._loading.get(user_id)
+        if future is None:
+            future = self._loading[user_id] = asyncio.get_running_loop().create_future()
+            self._batch[user_id] = user_info
+            self._schedule_batch()
+
+        return await asyncio.shield(future)
+
+    def invalidate(self, user_id: int = None):
+        user_ids = list(self._cache.keys() | self._loading.keys()) if user_id is None else [user_id]
+
+        for user_id in user_ids:
+            self._cache.pop(user_id, None)
+            # loads still waiting for their batch have not read anything yet and stay valid
+            if user_id not in self._batch:
+                self._loading.pop(user_id, None)
+
+    async def close(self):
+        self._dispatch_batch()
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+    def _schedule_batch(self):
+        if len(self._batch) >= self.max_batch_size:
+            self._dispatch_batch()
+        elif self._batch_handle is None:
+            self._batch_handle = asyncio.get_running_loop().call_later(self.batch_window, self._dispatch_batch)
+
+    def _dispatch_batch(self):
+        if self._batch_handle:
+            self._batch_handle.cancel()
+            self._batch_handle = None
+
+        batch, self._batch = self._batch, {}
+        if not batch:
+            return
+
+        futures = {user_id: self._loading[user_id] for user_id in batch}
+
+        task = asyncio.create_task(self._load_batch(list(batch.values()), futures))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _load_batch(self, user_infos: tp.List[UserInfo], futures: tp.Dict[int, asyncio.Future]):
+        self.stats.batches += 1
+
+        if self.batch_provider:
+            self.stats.provider_calls += 1
+            try:
+                data = await self.batch_provider(user_infos)
+                results = [data.get(user_info.user_id, {}) for user_info in user_infos]
+            except Exception as e:
+                results = [e] * len(user_infos)
+        else:
+            self.stats.provider_calls += len(user_infos)
+            results = await asyncio.gather(*(self.provider(user_info) for user_info in user_infos),
+                                           return_exceptions=True)
+
+        now = time.monotonic()
+        self._prune(now)
+
+        for user_info, result in zip(user_infos, results):
+            user_id = user_info.user_id
+            future = futures[user_id]
+
+            if isinstance(result, Exception):
+                self.stats.errors += 1
+                future.set_exception(result)
+            else:
+                # results of loads invalidated while in flight are handed out but not cached
+                if self._loading.get(user_id) is future and self.ttl > 0:
+                    self._cache[user_id] = (now + self.ttl, result)
+                future.set_result(result)
+
+            if self._loading.get(user_id) is future:
+                self._loading.pop(user_id)
+
+            # nobody may await a failed future, retrieve the exception to keep the loop quiet
+            future.exception()
+
+    def _prune(self, now: float):
+        if now - self._pruned_at < max(self.ttl, 1.):
+            return
+        self._pruned_at = now
+
+        for user_id in [user_id for user_id, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            self._cache.pop(user_id)
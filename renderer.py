@@ -3,22 +3,38 @@ import logging
 import math
 import typing as tp
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import rtgbot.components.widgets
 from rtgbot.base import ComponentTreeNode
 from rtgbot.components.base import WindowsGroup
-from rtgbot.etities.dom import DOMMessageUpdate, RenderContext, DOM
+from rtgbot.etities.dom import DOMMessageUpdate, RenderContext, DOM, DOMUpdate
 
 
 class Renderer:
+    # DOM edit costs
+    send_cost_mult = 2
+    edit_cost_mult = 1.5
+    delete_cost = 0.5
+
+    # the cost table is filled with numpy from this many cells, see benchmarks/bench_renderer.py
+    numpy_dom_diff_min_cells = 256
+
     def __init__(self, context: RenderContext):
         self.context = context
 
         self.component_tree: tp.Optional[WindowsGroup] = None
         self.dom: DOM = []
+        self.force_update_message_key: tp.Optional[str] = None
 
         self.render_cycle_id = 0
+        self._updated_nodes: tp.Set[ComponentTreeNode] = set()
 
     async def render(self, updated_nodes: tp.List[ComponentTreeNode], force_update_node: ComponentTreeNode = None):
+        self._updated_nodes = set(updated_nodes)
         modified_trees = []
 
         # collect modified trees
@@ -51,9 +67,17 @@ class Renderer:
 
             prev_node_key = list(children.keys())[list(children.values()).index(updated_node)]
 
-            children[prev_node_key] = await self._render_node(updated_node, updated_node)
+            rendered_node = await self._render_node(updated_node, updated_node)
+            children[prev_node_key] = rendered_node
             parent_node._render_data.children_visible = self._filter_visible_children(children)
 
+            # ancestors are not re-rendered, but the messages built from them have to be
+            subtree_render_cycle_id = rendered_node._render_data.subtree_render_cycle_id
+            while parent_node is not None:
+                if parent_node._render_data.subtree_render_cycle_id < subtree_render_cycle_id:
+                    parent_node._render_data.subtree_render_cycle_id = subtree_render_cycle_id
+                parent_node = parent_node._render_data.parent
+
         self.render_cycle_id += 1
         self.context.render_cycle_id = self.render_cycle_id
 
@@ -78,7 +102,7 @@ class Renderer:
             rendered_node._props = node._props
 
         rendered_node._context = self.context
-        rendered_node._render_data.render_cycle_id = self.render_cycle_id
+        is_dirty = rendered_node._is_dirty
         rendered_node._is_dirty = False
 
         # return previous version if not visible
@@ -102,6 +126,21 @@ class Renderer:
             rendered_node.rct._set_value(k, value, True)
             # logging.info(f"prop {k}: {prev_value} -> {value}")
 
+        # memoized node: its own state is unchanged and it does not need the new props
+        if not created and not is_dirty and rendered_node not in self._updated_nodes \
+                and not rendered_node.should_update(updated_props):
+            rendered_node._can_push_notifications = True
+
+            # updated nodes inside were left to this render as not top-level, render them on their own
+            async with asyncio.TaskGroup() as tg:
+                for node in self._find_updated_descendants(rendered_node):
+                    tg.create_task(self.render_tree(node))
+
+            return rendered_node
+
+        rendered_node._render_data.render_cycle_id = self.render_cycle_id
+        rendered_node._render_data.subtree_render_cycle_id = self.render_cycle_id
+
         try:
             if created:
                 await rendered_node.setup()
@@ -146,6 +185,9 @@ class Renderer:
 
             rendered_node._render_data.children = rendered_children
             rendered_node._render_data.children_visible = self._filter_visible_children(rendered_children)
+            for child in rendered_children.values():
+                if child._render_data.subtree_render_cycle_id > rendered_node._render_data.subtree_render_cycle_id:
+                    rendered_node._render_data.subtree_render_cycle_id = child._render_data.subtree_render_cycle_id
 
             if created:
                 await rendered_node.mounted()
@@ -194,6 +236,21 @@ class Renderer:
 
         return await self._render_node(child, prev_child), key
 
+    def _find_updated_descendants(self, node: ComponentTreeNode):
+        descendants = []
+
+        for updated_node in self._updated_nodes:
+            if not updated_node.is_visible:
+                continue
+
+            parent_node = updated_node._render_data.parent
+            while parent_node is not None and parent_node is not node and parent_node not in self._updated_nodes:
+                parent_node = parent_node._render_data.parent
+            if parent_node is node:
+                descendants.append(updated_node)
+
+        return descendants
+
     async def _unmount_recursive(self, node: ComponentTreeNode):
         await node.before_unmount()
 
@@ -233,7 +290,14 @@ class Renderer:
         if force_update_node is not None:
             force_update_node_key = force_update_node.rendered_chained_key
 
-        actions = self._calculate_dom_edit_actions(dom, new_dom, force_update_node_key)
+        self.force_update_message_key = force_update_node_key
+
+        self.dom = new_dom
+        return self.dom, self.calculate_dom_update(dom, new_dom, force_update_node_key)
+
+    @staticmethod
+    def calculate_dom_update(dom: DOM, new_dom: DOM, force_update_message_key: str = None) -> DOMUpdate:
+        actions = Renderer._calculate_dom_edit_actions(dom, new_dom, force_update_message_key)
         # logging.info(actions)
 
         dom_update = []
@@ -255,13 +319,29 @@ class Renderer:
                 new_message=new_message
             ))
 
-        self.dom = new_dom
-        return self.dom, dom_update
+        return dom_update
+
+    @staticmethod
+    def _calculate_dom_edit_actions(m1: tp.List, m2: tp.List, force_update_message_key: str, use_numpy: bool = None):
+        actions = Renderer._calculate_aligned_dom_edit_actions(m1, m2, force_update_message_key)
+        if actions is not None:
+            return actions
+
+        if use_numpy is None:
+            use_numpy = np is not None and len(m1) * len(m2) >= Renderer.numpy_dom_diff_min_cells
+
+        if use_numpy:
+            d = Renderer._fill_dom_edit_table_numpy(m1, m2, force_update_message_key)
+        else:
+            d = Renderer._fill_dom_edit_table(m1, m2, force_update_message_key)
+
+        return Renderer._backtrack_dom_edit_table(d, len(m1), len(m2))
 
-    def _calculate_dom_edit_actions(self, m1: tp.List, m2: tp.List, force_update_message_key: str):
-        send_cost_mult = 2
-        edit_cost_mult = 1.5
-        delete_cost = 0.5
+    @staticmethod
+    def _fill_dom_edit_table(m1: tp.List, m2: tp.List, force_update_message_key: str):
+        send_cost_mult = Renderer.send_cost_mult
+        edit_cost_mult = Renderer.edit_cost_mult
+        delete_cost = Renderer.delete_cost
 
         l1 = len(m1)
         l2 = len(m2)
@@ -316,6 +396,85 @@ class Renderer:
 
                 d[i][j] = min_cost1, min_cost2, action1, action2
 
+        return d
+
+    @staticmethod
+    def _fill_dom_edit_table_numpy(m1: tp.List, m2: tp.List, force_update_message_key: str):
+        # the same table as _fill_dom_edit_table, a row at a time: the update and send costs come from the previous
+        # row, the delete chains along the row are prefix minimums of cost - j * delete_cost
+        send_cost_mult = Renderer.send_cost_mult
+        edit_cost_mult = Renderer.edit_cost_mult
+        delete_cost = Renderer.delete_cost
+
+        l1 = len(m1)
+        l2 = len(m2)
+        if l1 == 0 or l2 == 0:
+            return Renderer._fill_dom_edit_table(m1, m2, force_update_message_key)
+
+        # equal content gets equal ids, hashing alone could confuse different content
+        def content_ids(attr):
+            ids = {}
+            return np.array([ids.setdefault(getattr(m, attr), len(ids)) for m in m1 + m2], dtype=np.int64)
+
+        text_ids = content_ids('text')
+        kbd_ids = content_ids('kbd_content')
+        media_ids = content_ids('media_content')
+
+        has_media = np.array([len(m.media) > 0 for m in m1 + m2])
+        media_count = np.array([len(m.media) for m in m2], dtype=np.float64)
+        send_costs = np.array([m.send_cost for m in m2], dtype=np.float64) * send_cost_mult
+
+        # edit costs, rows are new messages and columns are old ones
+        e = (media_ids[l1:, None] != media_ids[None, :l1]) * media_count[:, None] * 10 \
+            + (text_ids[l1:, None] != text_ids[None, :l1]) * 2. \
+            + (kbd_ids[l1:, None] != kbd_ids[None, :l1]) * 1.
+        e *= edit_cost_mult
+        if force_update_message_key is not None:
+            force_update = np.array([m.key == force_update_message_key for m in m1])
+            e[(e == 0) & force_update[None, :]] = 1
+        e[has_media[l1:, None] != has_media[None, :l1]] = np.inf
+
+        # the last row and column stand for index -1, as in the list version
+        c1 = np.zeros((l2 + 1, l1 + 1))
+        c2 = np.zeros((l2 + 1, l1 + 1))
+        a1 = np.zeros((l2 + 1, l1 + 1), dtype=np.int64)
+        a2 = np.zeros((l2 + 1, l1 + 1), dtype=np.int64)
+
+        # init send
+        c1[:l2, -1] = np.cumsum(send_costs)
+        c2[:l2, -1] = np.inf
+        a1[:l2, -1] = a2[:l2, -1] = 2
+        # init delete
+        c1[-1, :] = c2[-1, :] = (np.arange(l1 + 1) + 1) % (l1 + 1) * delete_cost
+        a1[-1, :] = a2[-1, :] = 1
+
+        steps = np.arange(l1 + 1) * delete_cost
+
+        for i in range(l2):
+            prev1 = c1[i - 1]
+            prev2 = c2[i - 1]
+
+            update = np.concatenate((prev2[-1:], prev2[:l1 - 1])) + e[i]
+            send = np.minimum(prev1[:l1], prev2[:l1]) + send_costs[i]
+
+            # without send, the chain starts at the inf of column -1
+            row2 = np.minimum.accumulate(update - steps[:l1]) + steps[:l1]
+            delete2 = np.concatenate(((np.inf,), row2[:l1 - 1])) + delete_cost
+
+            # send streak, the chain starts at column -1
+            row1 = np.minimum.accumulate(np.concatenate((c1[i, -1:], np.minimum(update, send))) - steps) + steps
+            row1 = row1[1:]
+            delete1 = np.concatenate((c1[i, -1:], row1[:l1 - 1])) + delete_cost
+
+            c1[i, :l1] = row1
+            c2[i, :l1] = row2
+            a1[i, :l1] = np.where(send < np.minimum(update, delete1), 2, np.where(delete1 < update, 1, 0))
+            a2[i, :l1] = delete2 < update
+
+        return [list(zip(*row)) for row in zip(c1.tolist(), c2.tolist(), a1.tolist(), a2.tolist())]
+
+    @staticmethod
+    def _backtrack_dom_edit_table(d, l1: int, l2: int):
         actions = []
 
         i, j = l2 - 1, l1 - 1
@@ -354,3 +513,38 @@ class Renderer:
         actions.reverse()
 
         return actions
+
+    @staticmethod
+    def _calculate_aligned_dom_edit_actions(m1: tp.List, m2: tp.List, force_update_message_key: str):
+        # fast path for the same message keys in the same order: every message is kept or edited in place,
+        # unless deleting some messages and sending the tail again could be cheaper, then the full table decides
+        send_cost_mult = Renderer.send_cost_mult
+        edit_cost_mult = Renderer.edit_cost_mult
+        delete_cost = Renderer.delete_cost
+
+        l = len(m2)
+        if l == 0 or len(m1) != l:
+            return None
+
+        edit_costs = []
+        for m_from, m_to in zip(m1, m2):
+            if m_from.key != m_to.key or not m_from.can_edit(m_to):
+                return None
+
+            edit_cost = m_from.edit_cost(m_to) * edit_cost_mult
+            if m_from.key == force_update_message_key and edit_cost == 0:
+                edit_cost = 1
+            edit_costs.append(edit_cost)
+
+        # any other path deletes k old messages and sends the last k new ones, which has to cost more
+        # than editing them in place together with all messages before them
+        prefix_cost = sum(edit_costs)
+        tail_cost = 0
+        for k in range(1, l + 1):
+            i = l - k
+            prefix_cost -= edit_costs[i]
+            tail_cost += send_cost_mult * m2[i].send_cost + delete_cost - edit_costs[i]
+            if prefix_cost >= tail_cost:
+                return None
+
+        return [(edit_cost == 0 and -1 or 0, i, i) for i, edit_cost in enumerate(edit_costs)]
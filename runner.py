@@ -1,42 +1,74 @@
 import asyncio
-import copy
+import contextlib
 import logging
 
 import typing as tp
 
 import aiogram
 from aiogram import Bot, Dispatcher, Router as BotRouter
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.filters import Command
-from aiogram.types import BotCommand, Message, CallbackQuery, User
+from aiogram.types import BotCommand, Message, CallbackQuery, User, Update
 
+from rtgbot.base import ComponentTreeNode
 from rtgbot.components.base import Window, WindowsGroup
+from rtgbot.etities.event import CallbackAck
 from rtgbot.etities.user_info import UserInfo
-from rtgbot.message_info_storage.memory_message_info_storage import MemoryTgMessageInfoStorage
+from rtgbot.latency_stats import LatencyStats
+from rtgbot.message_info_storage.indexed_memory_message_info_storage import IndexedMemoryTgMessageInfoStorage
 from rtgbot.message_info_storage.message_info_storage import TgMessageInfoStorage
 from rtgbot.message_sender import MessageSender
+from rtgbot.rate_limiter import RateLimits
+from rtgbot.render_context_loader import RenderContextLoader
+from rtgbot.session_manager import SessionManager
+from rtgbot.session_storage.session_storage import UserSessionStorage
 from rtgbot.user_session import UserSession
+from rtgbot.webhook_server import WebhookServer, WebhookConfig
 
 
 class Runner:
-    def __init__(self, start_screen: Window | WindowsGroup, bot_token: str,
-                 message_info_storage: TgMessageInfoStorage = MemoryTgMessageInfoStorage(),
+    def __init__(self, start_screen: Window | WindowsGroup | tp.Callable[[], Window | WindowsGroup], bot_token: str,
+                 message_info_storage: TgMessageInfoStorage = IndexedMemoryTgMessageInfoStorage(),
                  callback_query_handlers: tp.List[tp.Callable] = [],
                  render_context_provider: tp.Callable[[UserInfo], tp.Coroutine] = None,
+                 render_context_batch_provider: tp.Callable[[tp.List[UserInfo]], tp.Coroutine] = None,
+                 render_context_ttl: float = 5.,
                  on_user_session_started: tp.Callable[[UserInfo], tp.Coroutine] = None,
-                 on_user_session_stopped: tp.Callable[[UserInfo], tp.Coroutine] = None):
-        self.bot = Bot(bot_token, parse_mode="HTML")
+                 on_user_session_stopped: tp.Callable[[UserInfo], tp.Coroutine] = None,
+                 message_sender_workers: int = 16,
+                 rate_limits: RateLimits = None,
+                 session_idle_ttl: float = None,
+                 max_sessions: int = None,
+                 session_storage: UserSessionStorage = None,
+                 input_coalescing_window: float = 0.5,
+                 message_deletion_window: float = 1.,
+                 webhook: WebhookConfig = None,
+                 api_base_url: str = None):
+        session = AiohttpSession(api=TelegramAPIServer.from_base(api_base_url)) if api_base_url else None
+        self.bot = Bot(bot_token, session=session, parse_mode="HTML")
         self.dispatcher = Dispatcher()
         self.bot_router = BotRouter()
 
         self.start_screen = start_screen
-        self.message_sender = MessageSender(self.bot, message_info_storage)
+        self.message_sender = MessageSender(self.bot, message_info_storage, max_workers=message_sender_workers,
+                                            rate_limits=rate_limits, deletion_window=message_deletion_window)
         self.callback_queue = asyncio.Queue()
-        self.user_sessions: tp.Dict[int, UserSession] = {}
+        self.user_sessions = SessionManager(on_evict=self._evict_user_session,
+                                            idle_ttl=session_idle_ttl, max_sessions=max_sessions)
+        self.session_storage = session_storage
+        self._session_creations: tp.Dict[int, asyncio.Future] = {}
 
         self.callback_query_handlers = callback_query_handlers
-        self.render_context_provider = render_context_provider
+        self.render_context_loader = RenderContextLoader(render_context_provider, render_context_batch_provider,
+                                                         ttl=render_context_ttl)
         self.on_user_session_started = on_user_session_started
         self.on_user_session_stopped = on_user_session_stopped
+        self.input_coalescing_window = input_coalescing_window
+        self.ack_latency = LatencyStats()
+        # updates come through a webhook server when it is configured, through long polling otherwise
+        self.webhook_server = WebhookServer(self.bot, self.dispatcher, webhook) if webhook else None
+        self._is_polling = False
 
         @self.dispatcher.startup()
         async def _on_bot_startup():
@@ -63,7 +95,7 @@ class Runner:
             session.navigator.reset()
             if not created:
                 await session.schedule_screen_reset()
-                await self._try_delete_message(message)
+                self._try_delete_message(message)
 
         @self.bot_router.message(Command(commands=["refresh"]))
         async def handle_start_command(message: Message) -> None:
@@ -76,7 +108,7 @@ class Runner:
                 return
 
             session.root.invalidate()
-            await self._try_delete_message(message)
+            self._try_delete_message(message)
 
         @self.bot_router.message(Command(commands=["back"]))
         async def handle_start_command(message: Message) -> None:
@@ -89,86 +121,235 @@ class Runner:
                 return
 
             session.navigator.back()
-            await self._try_delete_message(message)
+            self._try_delete_message(message)
 
         @self.bot_router.message()
         async def message_handler(message: Message) -> None:
             if not self._check_chat_private(message):
                 return
 
-            await asyncio.sleep(0.5)
-
             user = message.from_user
             session, _ = await self._get_user_session(UserInfo(user.id, user))
             if await self._check_user_banned(session):
                 return
 
-            session.event_processor.push_message_input(message)
-            await self._try_delete_message(message)
+            session.input_coalescer.push(message)
+            self._try_delete_message(message)
 
         @self.bot_router.callback_query()
         async def handle_callback_query(callback_query: CallbackQuery):
             user = callback_query.from_user
-            session, created = await self._get_user_session(UserInfo(user.id, user), start_immediately=False)
-            if created:
-                await session.start(display=False)
+            session, created = await self._get_user_session(UserInfo(user.id, user), display=False)
 
             if await self._check_user_banned(session):
                 return
 
-            if not session.event_processor.push_button_click(callback_query.data):
-                for handler in self.callback_query_handlers:
-                    if await handler(callback_query):
-                        return
+            ack = CallbackAck(callback_query, self.ack_latency)
 
-                await session.schedule_screen_reset()
+            event = session.event_processor.push_button_click(callback_query.data, ack)
+            if event:
+                # answer right away so the client drops its spinner, deferred acks are answered by the handler
+                if not event.dom_element.defer_ack:
+                    await ack.answer(event.dom_element.toast, event.dom_element.show_alert)
+                return
+
+            for handler in self.callback_query_handlers:
+                if await handler(callback_query):
+                    return
+
+            await ack.answer()
+            await session.schedule_screen_reset()
 
     def start(self):
         self.message_sender.start()
-        asyncio.create_task(self.dispatcher.start_polling(self.bot))
+        self.user_sessions.start()
+
+        if self.webhook_server:
+            asyncio.create_task(self.webhook_server.start())
+        else:
+            self._is_polling = True
+            asyncio.create_task(self.dispatcher.start_polling(self.bot))
+
+    async def start_local(self):
+        # updates are passed in through feed_update, e.g. by a sharded runner front
+        self.message_sender.start()
+        self.user_sessions.start()
+        await self.dispatcher.emit_startup(bot=self.bot, dispatcher=self.dispatcher)
+
+    async def feed_update(self, update: Update):
+        await self.dispatcher.feed_update(self.bot, update)
 
     async def stop(self):
         async with asyncio.TaskGroup() as tg:
-            tg.create_task(self.dispatcher.stop_polling())
-            tg.create_task(self.message_sender.stop())
+            if self.webhook_server:
+                tg.create_task(self.webhook_server.stop())
+            elif self._is_polling:
+                tg.create_task(self.dispatcher.stop_polling())
+            tg.create_task(self.user_sessions.stop())
+            tg.create_task(self._evict_user_sessions())
+
+        # evicted sessions still schedule their last screen updates and message infos
+        await self.message_sender.stop()
 
-            for user_id in self.user_sessions.keys():
-                tg.create_task(self.reset_user_session(user_id))
+        if self.session_storage:
+            await self.session_storage.close()
+
+        await self.render_context_loader.close()
+
+        if not self.webhook_server and not self._is_polling:
+            await self.dispatcher.emit_shutdown(bot=self.bot, dispatcher=self.dispatcher)
+        await self.bot.session.close()
+
+    def invalidate_render_context(self, user_id: int = None):
+        self.render_context_loader.invalidate(user_id)
 
     async def reset_user_session(self, user_id: int):
-        session, created = await self._get_user_session(UserInfo(user_id=user_id))
+        session, created = self.user_sessions.get(user_id), False
+        if session is None:
+            session, created = await self._get_user_session(UserInfo(user_id=user_id))
 
         if not created:
             session.navigator.reset()
 
-        await session.stop()
-        self.user_sessions.pop(user_id)
+        async with self._stopping_user_session(user_id):
+            self.user_sessions.pop(user_id, None)
+            await session.stop()
 
         if self.on_user_session_stopped:
             await self.on_user_session_stopped(session.user_info)
 
-    async def _get_user_session(self, user_info: UserInfo, start_immediately=True):
+    async def hibernate_user_session(self, user_id: int):
+        session = self.user_sessions.get(user_id)
+        if session is None:
+            return
+
+        async with self._stopping_user_session(user_id):
+            self.user_sessions.pop(user_id, None)
+            await session.stop()
+
+            try:
+                await self.session_storage.save(user_id, session.snapshot())
+            except Exception:
+                # e.g. a screen pushed with a lambda factory cannot be pickled
+                # the session is already stopped, the next update starts a new one
+                logging.warning(f"can't hibernate session of user {user_id}, dropping it", exc_info=True)
+
+        if self.on_user_session_stopped:
+            await self.on_user_session_stopped(session.user_info)
+
+    @contextlib.asynccontextmanager
+    async def _stopping_user_session(self, user_id: int):
+        # updates arriving while the session is stopped wait for it like for a creation, then start a new one
+        stopping = asyncio.get_running_loop().create_future()
+        self._session_creations[user_id] = stopping
+        try:
+            yield
+        finally:
+            if self._session_creations.get(user_id) is stopping:
+                self._session_creations.pop(user_id)
+            stopping.set_result(None)
+
+    async def _evict_user_sessions(self):
+        # stops already in flight, e.g. evictions by the session manager, are waited for instead of repeated
+        in_flight = list(self._session_creations.values())
+        if in_flight:
+            await asyncio.wait(in_flight)
+
+        await asyncio.gather(*(self._evict_user_session(user_id) for user_id in self.user_sessions.keys()))
+
+    async def _evict_user_session(self, user_id: int):
+        # the session may be gone already, e.g. stopped for a banned user, then there is nothing to evict
+        if user_id not in self.user_sessions:
+            return
+
+        if self.session_storage:
+            await self.hibernate_user_session(user_id)
+        else:
+            await self.reset_user_session(user_id)
+
+    async def _get_user_session(self, user_info: UserInfo, display=True):
         user_id = user_info.user_id
 
+        while True:
+            try:
+                session = self.user_sessions[user_id]
+                session.update_user_info(user_info)
+
+                return session, False
+            except KeyError:
+                pass
+
+            # concurrent updates of a new user wait for the session that is already being created
+            creation = self._session_creations.get(user_id)
+            if creation is None:
+                break
+
+            session = await asyncio.shield(creation)
+            if session is not None:
+                session.update_user_info(user_info)
+                return session, False
+
+        creation = asyncio.get_running_loop().create_future()
+        self._session_creations[user_id] = creation
+
+        session = None
         try:
-            session = self.user_sessions[user_id]
-            session.update_user_info(user_info)
+            session, created = await self._create_user_session(user_info, display)
+            return session, created
+        finally:
+            self._session_creations.pop(user_id, None)
+            # waiters retry on their own if creation failed
+            creation.set_result(session)
+
+    async def _create_user_session(self, user_info: UserInfo, display: bool):
+        user_id = user_info.user_id
 
-            return session, False
-        except KeyError:
-            session = UserSession(self.bot, user_info, copy.deepcopy(self.start_screen), self.message_sender,
-                                  self.render_context_provider, self.on_user_session_started)
-            if start_immediately:
-                await session.start()
-            self.user_sessions[user_id] = session
+        session = self._new_user_session(user_info)
 
-            return session, True
+        snapshot = await self._load_session_snapshot(user_id)
+        if snapshot:
+            try:
+                await session.resume(snapshot)
+                self.user_sessions[user_id] = session
+
+                # the user keeps the session they had before hibernation
+                return session, False
+            except Exception:
+                logging.exception(f"Exception while resuming session of user {user_id}:")
+                await session.stop()
+                session = self._new_user_session(user_info)
+
+        await session.start(display=display)
+        self.user_sessions[user_id] = session
+
+        return session, True
+
+    async def _load_session_snapshot(self, user_id: int):
+        if not self.session_storage:
+            return None
 
-    async def _try_delete_message(self, message):
         try:
-            await message.delete()
+            snapshot = await self.session_storage.load(user_id)
+            if snapshot:
+                await self.session_storage.delete(user_id)
+            return snapshot
         except Exception:
-            pass
+            logging.exception(f"Exception while loading hibernated session of user {user_id}:")
+            return None
+
+    def _new_user_session(self, user_info: UserInfo):
+        return UserSession(self.bot, user_info, self._create_start_screen(), self.message_sender,
+                           self.render_context_loader, self.on_user_session_started,
+                           input_coalescing_window=self.input_coalescing_window)
+
+    def _create_start_screen(self):
+        # a prototype instance is cloned, anything else is treated as a screen factory
+        if isinstance(self.start_screen, ComponentTreeNode):
+            return self.start_screen.clone()
+        return self.start_screen()
+
+    def _try_delete_message(self, message: Message):
+        self.message_sender.schedule_message_deletion(message.chat.id, message.message_id)
 
     def _check_chat_private(self, message: Message):
         return message.chat.type == "private"
@@ -176,8 +357,10 @@ class Runner:
     async def _check_user_banned(self, session: UserSession):
         if session.context.is_banned:
             session.navigator.reset()
-            await session.stop()
-            self.user_sessions.pop(session.context.user_id)
+            async with self._stopping_user_session(session.context.user_id):
+                self.user_sessions.pop(session.context.user_id, None)
+                await session.stop()
+
             if self.on_user_session_stopped:
                 await self.on_user_session_stopped(session.user_info)
 
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+import typing as tp
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from rtgbot.user_session import UserSession
+
+
+@dataclass
+class SessionManagerStats:
+    live_sessions: int = 0
+    peak_sessions: int = 0
+    evicted_idle: int = 0
+    evicted_lru: int = 0
+
+
+class SessionManager:
+    def __init__(self, on_evict: tp.Callable[[int], tp.Coroutine],
+                 idle_ttl: float = None, max_sessions: int = None, sweep_interval: float = 60.):
+        self.on_evict = on_evict
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+
+        # least recently used sessions first
+        self._sessions: tp.OrderedDict[int, UserSession] = OrderedDict()
+        self._accessed_at: tp.Dict[int, float] = {}
+        self._evicting: tp.Set[int] = set()
+
+        self._stats = SessionManagerStats()
+        self._sweeper_task: tp.Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.idle_ttl is not None:
+            self._sweeper_task = asyncio.create_task(self._sweeper())
+
+    async def stop(self):
+        if self._sweeper_task:
+            self._sweeper_task.cancel()
+            self._sweeper_task = None
+
+    @property
+    def stats(self) -> SessionManagerStats:
+        self._stats.live_sessions = len(self._sessions)
+        return self._stats
+
+    def get(self, user_id: int, default=None) -> tp.Optional[UserSession]:
+        try:
+            return self[user_id]
+        except KeyError:
+            return default
+
+    def pop(self, user_id: int, *default):
+        self._accessed_at.pop(user_id, None)
+        self._evicting.discard(user_id)
+        return self._sessions.pop(user_id, *default)
+
+    def keys(self):
+        return list(self._sessions.keys())
+
+    def values(self):
+        return list(self._sessions.values())
+
+    def __getitem__(self, user_id: int) -> UserSession:
+        session = self._sessions[user_id]
+        self._touch(user_id)
+        return session
+
+    def __setitem__(self, user_id: int, session: UserSession):
+        self._sessions[user_id] = session
+        self._touch(user_id)
+
+        self._stats.peak_sessions = max(self._stats.peak_sessions, len(self._sessions))
+        self._evict_over_limit()
+
+    def __contains__(self, user_id: int):
+        return user_id in self._sessions
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def _touch(self, user_id: int):
+        self._sessions.move_to_end(user_id)
+        self._accessed_at[user_id] = time.monotonic()
+
+    def _evict_over_limit(self):
+        if self.max_sessions is None:
+            return
+
+        for user_id in self._sessions.keys():
+            if len(self._sessions) - len(self._evicting) <= self.max_sessions:
+                break
+            if user_id not in self._evicting:
+                self._stats.evicted_lru += 1
+                self._evict(user_id)
+
+    def _evict_idle(self):
+        deadline = time.monotonic() - self.idle_ttl
+
+        for user_id in self._sessions.keys():
+            if self._accessed_at[user_id] > deadline:
+                break
+            if user_id not in self._evicting:
+                self._stats.evicted_idle += 1
+                self._evict(user_id)
+
+    def _evict(self, user_id: int):
+        self._evicting.add(user_id)
+        asyncio.create_task(self._run_eviction(user_id))
+
+    async def _run_eviction(self, user_id: int):
+        try:
+            await self.on_evict(user_id)
+        except Exception:
+            logging.exception("Exception while evicting user session:")
+        finally:
+            self._evicting.discard(user_id)
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(min(self.sweep_interval, self.idle_ttl))
+            self._evict_idle()
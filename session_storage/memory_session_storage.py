@@ -0,0 +1,20 @@
+import typing as tp
+
+from rtgbot.etities.session_snapshot import SessionSnapshot
+from rtgbot.session_storage.session_storage import UserSessionStorage
+
+
+class MemoryUserSessionStorage(UserSessionStorage):
+    def __init__(self):
+        # snapshots are kept serialized, a hibernated user costs only a few hundred bytes
+        self.snapshots: tp.Dict[int, bytes] = {}
+
+    async def save(self, user_id: int, snapshot: SessionSnapshot):
+        self.snapshots[user_id] = self.dumps(snapshot)
+
+    async def load(self, user_id: int):
+        data = self.snapshots.get(user_id)
+        return data is not None and self.loads(data) or None
+
+    async def delete(self, user_id: int):
+        self.snapshots.pop(user_id, None)
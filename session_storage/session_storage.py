@@ -0,0 +1,27 @@
+import pickle
+import zlib
+from abc import ABC
+
+from rtgbot.etities.session_snapshot import SessionSnapshot
+
+
+class UserSessionStorage(ABC):
+    async def save(self, user_id: int, snapshot: SessionSnapshot):
+        raise NotImplementedError
+
+    async def load(self, user_id: int) -> SessionSnapshot | None:
+        raise NotImplementedError
+
+    async def delete(self, user_id: int):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    @staticmethod
+    def dumps(snapshot: SessionSnapshot) -> bytes:
+        return zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def loads(data: bytes) -> SessionSnapshot:
+        return pickle.loads(zlib.decompress(data))
@@ -0,0 +1,58 @@
+import asyncio
+import sqlite3
+import time
+import typing as tp
+
+from concurrent.futures import ThreadPoolExecutor
+
+from rtgbot.etities.session_snapshot import SessionSnapshot
+from rtgbot.session_storage.session_storage import UserSessionStorage
+
+
+class SqliteUserSessionStorage(UserSessionStorage):
+    _create_table_sql = '''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            user_id INTEGER PRIMARY KEY,
+            snapshot BLOB NOT NULL,
+            saved_at REAL NOT NULL
+        )
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-user-session")
+        self._connection: tp.Optional[sqlite3.Connection] = None
+
+    async def save(self, user_id: int, snapshot: SessionSnapshot):
+        data = self.dumps(snapshot)
+        await self._run(self._execute, 'INSERT OR REPLACE INTO user_sessions VALUES (?, ?, ?)',
+                        (user_id, data, time.time()))
+
+    async def load(self, user_id: int):
+        rows = await self._run(self._execute, 'SELECT snapshot FROM user_sessions WHERE user_id = ?', (user_id,))
+        return rows and self.loads(rows[0][0]) or None
+
+    async def delete(self, user_id: int):
+        await self._run(self._execute, 'DELETE FROM user_sessions WHERE user_id = ?', (user_id,))
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close_connection)
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, func: tp.Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _execute(self, sql: str, params: tuple):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(self._create_table_sql)
+
+        with self._connection:
+            return self._connection.execute(sql, params).fetchall()
+
+    def _close_connection(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,242 @@
+import asyncio
+import bisect
+import dataclasses
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+import typing as tp
+from dataclasses import dataclass
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Update
+
+from rtgbot.rate_limiter import RateLimiter
+from rtgbot.runner import Runner
+from rtgbot.webhook_server import WebhookServer, WebhookConfig
+
+
+class HashRing:
+    def __init__(self, nodes: tp.Iterable[int], replicas: int = 64):
+        self.replicas = replicas
+        self._ring: tp.List[tp.Tuple[int, int]] = []
+
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: int):
+        for i in range(self.replicas):
+            bisect.insort(self._ring, (self._hash(f"{node}:{i}"), node))
+
+    def remove_node(self, node: int):
+        self._ring = [point for point in self._ring if point[1] != node]
+
+    def get_node(self, key: int) -> int:
+        # the first virtual node clockwise from the key owns it
+        i = bisect.bisect(self._ring, (self._hash(str(key)),))
+        return self._ring[i % len(self._ring)][1]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+@dataclass
+class WorkerStats:
+    worker: int
+    pid: int = 0
+    updates: int = 0
+    failed: int = 0
+    in_flight: int = 0
+    sessions: int = 0
+    queue_depth: int = 0
+    loop_lag: float = 0.
+    render_latency_p95: float = 0.
+    ack_latency_p95: float = 0.
+    is_final: bool = False
+
+
+class ShardedRunner:
+    def __init__(self, runner_factory: tp.Callable[[], Runner], bot_token: str, workers: int = None,
+                 api_base_url: str = None, webhook: WebhookConfig = None,
+                 max_concurrency: int = 256, metrics_interval: float = 1.):
+        # runner_factory runs inside the worker processes, so it has to be picklable
+        self.runner_factory = runner_factory
+        self.workers = workers or os.cpu_count()
+        self.max_concurrency = max_concurrency
+        self.metrics_interval = metrics_interval
+
+        session = AiohttpSession(api=TelegramAPIServer.from_base(api_base_url)) if api_base_url else None
+        self.bot = Bot(bot_token, session=session)
+        self.dispatcher = Dispatcher()
+        self.dispatcher.update.outer_middleware(self._route_update)
+        self.webhook_server = WebhookServer(self.bot, self.dispatcher, webhook) if webhook else None
+
+        self.ring = HashRing(range(self.workers))
+        self.worker_stats: tp.Dict[int, WorkerStats] = {}
+        self.routed_updates = 0
+
+        self._mp = multiprocessing.get_context('spawn')
+        self._update_queues: tp.List[multiprocessing.Queue] = []
+        self._metrics_queue: tp.Optional[multiprocessing.Queue] = None
+        self._processes: tp.List[multiprocessing.Process] = []
+        self._metrics_task: tp.Optional[asyncio.Task] = None
+        self._workers_ready = asyncio.Event()
+        self._polling_task: tp.Optional[asyncio.Task] = None
+
+    def start(self):
+        self._metrics_queue = self._mp.Queue()
+
+        for worker in range(self.workers):
+            updates = self._mp.Queue()
+            process = self._mp.Process(
+                target=_run_worker, name=f"rtgbot-worker-{worker}", daemon=True,
+                args=(worker, self.workers, self.runner_factory, updates, self._metrics_queue,
+                      self.max_concurrency, self.metrics_interval))
+            process.start()
+
+            self._update_queues.append(updates)
+            self._processes.append(process)
+
+        self._metrics_task = asyncio.create_task(self._collect_metrics())
+
+        if self.webhook_server:
+            asyncio.create_task(self.webhook_server.start())
+        else:
+            self._polling_task = asyncio.create_task(self.dispatcher.start_polling(
+                self.bot, allowed_updates=["message", "callback_query"], handle_signals=False))
+
+    async def wait_ready(self):
+        # workers report right after their runner has started
+        await self._workers_ready.wait()
+
+    async def stop(self):
+        if self.webhook_server:
+            await self.webhook_server.stop()
+        elif self._polling_task:
+            await self.dispatcher.stop_polling()
+
+        loop = asyncio.get_running_loop()
+
+        for updates in self._update_queues:
+            updates.put(None)
+        for process in self._processes:
+            await loop.run_in_executor(None, process.join)
+
+        self._metrics_queue.put(None)
+        await self._metrics_task
+        await self.bot.session.close()
+
+    def feed_update(self, update: Update):
+        worker = self.ring.get_node(self._get_routing_key(update))
+        self._update_queues[worker].put(update.model_dump_json(by_alias=True, exclude_none=True))
+        self.routed_updates += 1
+
+    async def _route_update(self, handler, update: Update, data: tp.Dict):
+        self.feed_update(update)
+
+    def _get_routing_key(self, update: Update) -> int:
+        event = update.event
+
+        # all updates of one user go to the worker that owns their session
+        user = getattr(event, 'from_user', None)
+        if user is not None:
+            return user.id
+
+        chat = getattr(event, 'chat', None)
+        if chat is not None:
+            return chat.id
+
+        return update.update_id
+
+    async def _collect_metrics(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            stats: WorkerStats = await loop.run_in_executor(None, self._metrics_queue.get)
+            if stats is None:
+                break
+            self.worker_stats[stats.worker] = stats
+
+            if len(self.worker_stats) == self.workers:
+                self._workers_ready.set()
+
+
+def _run_worker(worker: int, workers: int, runner_factory: tp.Callable[[], Runner],
+                updates: multiprocessing.Queue, metrics: multiprocessing.Queue,
+                max_concurrency: int, metrics_interval: float):
+    try:
+        asyncio.run(_worker_main(worker, workers, runner_factory, updates, metrics,
+                                 max_concurrency, metrics_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_main(worker: int, workers: int, runner_factory: tp.Callable[[], Runner],
+                       updates: multiprocessing.Queue, metrics: multiprocessing.Queue,
+                       max_concurrency: int, metrics_interval: float):
+    runner = runner_factory()
+
+    # chats are partitioned, but the bot-wide limit is shared by all workers
+    message_sender = runner.message_sender
+    limits = message_sender.rate_limiter.limits
+    message_sender.rate_limiter = RateLimiter(dataclasses.replace(
+        limits, global_rate=limits.global_rate / workers, global_burst=max(1., limits.global_burst / workers)))
+
+    await runner.start_local()
+
+    stats = WorkerStats(worker=worker, pid=os.getpid())
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks: tp.Set[asyncio.Task] = set()
+
+    def report(is_final=False):
+        stats.in_flight = len(tasks)
+        stats.sessions = len(runner.user_sessions)
+        stats.queue_depth = message_sender.queue_depth
+        stats.render_latency_p95 = message_sender.render_latency.percentile(95)
+        stats.ack_latency_p95 = runner.ack_latency.percentile(95)
+        stats.is_final = is_final
+        metrics.put(stats)
+
+    async def reporter():
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(metrics_interval)
+            stats.loop_lag = time.monotonic() - start - metrics_interval
+            report()
+
+    async def feed(update: Update):
+        try:
+            await runner.feed_update(update)
+        except Exception:
+            stats.failed += 1
+            logging.exception("Exception while processing update:")
+        finally:
+            semaphore.release()
+
+    report()
+    reporter_task = asyncio.create_task(reporter())
+    loop = asyncio.get_running_loop()
+
+    while True:
+        data = await loop.run_in_executor(None, updates.get)
+        if data is None:
+            break
+
+        stats.updates += 1
+        await semaphore.acquire()
+
+        task = asyncio.create_task(feed(Update.model_validate_json(data, context={"bot": runner.bot})))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    reporter_task.cancel()
+    report(is_final=True)
+
+    await runner.stop()
@@ -0,0 +1,61 @@
+from rtgbot.base import state
+from rtgbot.components.base import Component, Window
+from rtgbot.components.widgets import Button
+
+
+class Counter(Component):
+    count = state(0)
+    double = state()
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.double = self.rct.computed(lambda: self.count * 2)
+        self.changes = []
+        self.rct.watch(lambda: self.count, self.on_count_changed, immediate=False)
+
+    def on_count_changed(self, value, prev_value):
+        self.changes.append(value)
+
+
+class Screen(Window):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.clicks = 0
+
+    async def handle_click(self, e):
+        self.clicks += 1
+
+
+def test_clone_copies_dict_and_set_props():
+    prototype = Window(style={"color": "red"})
+    prototype._props["tags"] = {"a"}
+
+    clone = prototype.clone()
+    clone.props.style["color"] = "blue"
+    clone.props.tags.add("b")
+
+    assert prototype.props.style == {"color": "red"}
+    assert prototype.props.tags == {"a"}
+
+
+def test_clone_rebinds_prototype_callbacks():
+    prototype = Screen()
+    prototype(Button(on_click=prototype.handle_click)("click"))
+
+    clone = prototype.clone()
+    button = clone.props.children[0]
+
+    assert button is not prototype.props.children[0]
+    assert button.props.on_click.__self__ is clone
+
+
+def test_clone_rebuilds_computed_values_and_watchers():
+    prototype = Counter()
+
+    clone = prototype.clone()
+    clone.count = 5
+
+    assert clone.double == 10
+    assert clone.changes == [5]
+    assert prototype.double == 0
+    assert prototype.changes == []
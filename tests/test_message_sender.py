@@ -0,0 +1,75 @@
+import asyncio
+
+from rtgbot.components.base import Window, WindowsGroup
+from rtgbot.components.widgets import Button, Text
+from rtgbot.etities.dom import DOMMessageUpdate
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.message_info_storage.memory_message_info_storage import MemoryTgMessageInfoStorage
+from rtgbot.message_sender import MessageSender, ScreenTask
+from rtgbot.user_session import UserSession
+
+
+class RecordingMessageSender:
+    def __init__(self):
+        self.tasks = []
+
+    def schedule_screen_reset(self, chat_id, dom):
+        self.tasks.append(ScreenTask(chat_id=chat_id, dom=dom))
+
+    def schedule_screen_update(self, chat_id, dom, dom_update, prev_dom=None, force_update_message_key=None):
+        self.tasks.append(ScreenTask(chat_id=chat_id, dom=dom, dom_update=dom_update, prev_dom=prev_dom,
+                                     force_update_message_keys=frozenset((force_update_message_key,))))
+
+
+class Counter(Window):
+    async def setup(self):
+        self.count = 0
+
+    async def render(self):
+        return Text(f"count {self.count}"), Button(on_click=self.inc)("inc")
+
+    async def inc(self, e):
+        self.count += 1
+
+
+class Noop(Window):
+    async def render(self):
+        return Text("noop"), Button()("noop")
+
+
+async def click(session, text):
+    button_id = next(button_id for button_id, button in session.event_processor.button_elements.items()
+                     if button.text == text)
+    session.event_processor.push_button_click(button_id)
+    await session.event_processor.event_queue.join()
+
+
+def test_coalesced_update_keeps_forced_update_of_pending_task():
+    async def run():
+        recorder = RecordingMessageSender()
+        session = UserSession(None, UserInfo(1), WindowsGroup()(Noop(key="noop"), Counter(key="counter")),
+                              recorder)
+        await session.start()
+
+        # the first click changes nothing but forces its message to be edited, the second one changes another message
+        await click(session, "noop")
+        await click(session, "inc")
+        await session.stop()
+
+        _, pending, task = recorder.tasks
+        noop_key, counter_key = (message.key for message in task.dom)
+        assert pending.force_update_message_keys == {noop_key}
+        assert [update.action for update in pending.dom_update] == [DOMMessageUpdate.Action.update,
+                                                                    DOMMessageUpdate.Action.keep]
+
+        sender = MessageSender(None, MemoryTgMessageInfoStorage())
+        merged = sender._coalesce_screen_tasks(pending, task)
+
+        assert merged.force_update_message_keys == {noop_key, counter_key}
+        assert merged.prev_dom is pending.prev_dom
+        assert {update.old_message.key: update.action for update in merged.dom_update} == {
+            noop_key: DOMMessageUpdate.Action.update,
+            counter_key: DOMMessageUpdate.Action.update,
+        }
+
+    asyncio.run(run())
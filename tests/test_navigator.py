@@ -0,0 +1,108 @@
+import asyncio
+from enum import Enum, auto
+
+from rtgbot.base import state
+from rtgbot.components.base import Window
+from rtgbot.components.navigation_buttons import Back, Navigate
+from rtgbot.components.widgets import Button, Text
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.user_session import UserSession
+
+
+class RecordingMessageSender:
+    def __init__(self):
+        self.dom = None
+
+    def schedule_screen_reset(self, chat_id, dom):
+        self.dom = dom
+
+    def schedule_screen_update(self, chat_id, dom, dom_update, prev_dom=None, force_update_message_key=None):
+        self.dom = dom
+
+
+class Screen(Window):
+    class States(Enum):
+        A = auto()
+        B = auto()
+
+    clicks = state(0)
+
+    async def render(self):
+        return (
+            Text(f"state={self.state.name} clicks={self.clicks}"),
+            Button(on_click=self.click)("click"),
+            Navigate(state=Screen.States.B)("to B"),
+            Back()("back"),
+        )
+
+    async def click(self, e):
+        self.clicks += 1
+
+
+class Home(Window):
+    async def render(self):
+        return Text("home"), Navigate(to=Screen)("open")
+
+
+async def start_session(start_screen):
+    sender = RecordingMessageSender()
+    session = UserSession(None, UserInfo(1), start_screen, sender)
+    await session.start()
+    return session, sender
+
+
+async def click(session, text):
+    button_id = next(button_id for button_id, button in session.event_processor.button_elements.items()
+                     if button.text == text)
+    session.event_processor.push_button_click(button_id)
+    await session.event_processor.event_queue.join()
+
+
+def test_explicit_state_screen_is_explicit():
+    assert Screen._explicit_state
+    assert 'clicks' in Screen._state_fields
+
+
+def test_navigate_state_rerenders_explicit_state_screen():
+    async def run():
+        session, sender = await start_session(Home())
+        await click(session, "open")
+        await click(session, "click")
+        await click(session, "to B")
+
+        assert "state=B clicks=1" in sender.dom[0].text
+        await session.stop()
+
+    asyncio.run(run())
+
+
+def test_back_state_rerenders_explicit_state_screen():
+    async def run():
+        session, sender = await start_session(Home())
+        await click(session, "open")
+        await click(session, "to B")
+        await click(session, "click")
+        assert "state=B clicks=1" in sender.dom[0].text
+
+        await click(session, "back")
+        assert "state=A clicks=1" in sender.dom[0].text
+        await session.stop()
+
+    asyncio.run(run())
+
+
+def test_restore_state_rerenders_explicit_state_screen():
+    async def run():
+        session, sender = await start_session(Home())
+        await click(session, "open")
+        await click(session, "to B")
+        snapshot = session.snapshot()
+        await session.stop()
+
+        resumed_session = UserSession(None, UserInfo(1), Home(), sender)
+        await resumed_session.resume(snapshot)
+
+        assert "state=B clicks=0" in resumed_session.renderer.dom[0].text
+        await resumed_session.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,81 @@
+import asyncio
+
+from rtgbot.base import state
+from rtgbot.components.base import Component, PureComponent, Window
+from rtgbot.components.widgets import Button, Text
+from rtgbot.decorators import register_props
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.user_session import UserSession
+
+
+class RecordingMessageSender:
+    def __init__(self):
+        self.dom = None
+
+    def schedule_screen_reset(self, chat_id, dom):
+        self.dom = dom
+
+    def schedule_screen_update(self, chat_id, dom, dom_update, prev_dom=None, force_update_message_key=None):
+        self.dom = dom
+
+
+class Leaf(Component):
+    count = state(0)
+
+    @register_props
+    def __init__(self, on_change=None, **kwargs):
+        super().__init__(**kwargs)
+
+    async def render(self):
+        return Text(f"leaf={self.count}"), Button(on_click=self.click)("click")
+
+    async def click(self, e):
+        self.count += 1
+        self.props.on_change()
+
+
+class Memo(PureComponent):
+    renders = 0
+
+    @register_props
+    def __init__(self, on_change=None, **kwargs):
+        super().__init__(**kwargs)
+
+    async def render(self):
+        Memo.renders += 1
+        return Leaf(on_change=self.props.on_change)
+
+
+class Screen(Window):
+    count = state(0)
+
+    async def render(self):
+        return Text(f"screen={self.count}"), Memo(on_change=self.increment)
+
+    def increment(self):
+        self.count += 1
+
+
+async def click(session, text):
+    button_id = next(button_id for button_id, button in session.event_processor.button_elements.items()
+                     if button.text == text)
+    session.event_processor.push_button_click(button_id)
+    await session.event_processor.event_queue.join()
+
+
+def test_memoized_node_renders_its_updated_descendants():
+    async def run():
+        sender = RecordingMessageSender()
+        session = UserSession(None, UserInfo(1), Screen(), sender)
+        await session.start()
+        renders = Memo.renders
+
+        await click(session, "click")
+
+        text = sender.dom[0].text
+        assert "screen=1" in text and "leaf=1" in text
+        # the memoized node itself is still skipped
+        assert Memo.renders == renders
+        await session.stop()
+
+    asyncio.run(run())
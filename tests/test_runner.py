@@ -0,0 +1,101 @@
+import asyncio
+import collections
+
+from rtgbot.components.base import Window
+from rtgbot.components.widgets import Button, Text
+from rtgbot.etities.user_info import UserInfo
+from rtgbot.runner import Runner
+
+
+class NullMessageSender:
+    def schedule_screen_reset(self, chat_id, dom):
+        pass
+
+    def schedule_screen_update(self, chat_id, dom, dom_update, prev_dom=None, force_update_message_key=None):
+        pass
+
+
+class Screen(Window):
+    async def render(self):
+        return Text("screen"), Button()("button")
+
+
+def create_runner(on_started):
+    runner = Runner(Screen(), "123456:test", on_user_session_started=on_started)
+    runner.message_sender = NullMessageSender()
+    return runner
+
+
+async def start_command(runner, user_id):
+    return await runner._get_user_session(UserInfo(user_id))
+
+
+async def message(runner, user_id):
+    return await runner._get_user_session(UserInfo(user_id))
+
+
+async def callback_query(runner, user_id):
+    return await runner._get_user_session(UserInfo(user_id), display=False)
+
+
+async def stop_sessions(runner):
+    for session in runner.user_sessions.values():
+        await session.stop()
+
+
+def test_concurrent_updates_of_new_users_create_one_session_each():
+    async def run():
+        started = collections.Counter()
+
+        async def on_started(user_info):
+            started[user_info.user_id] += 1
+            # keep the creation in flight while the other updates arrive
+            await asyncio.sleep(0.01)
+
+        runner = create_runner(on_started)
+        user_ids = range(10)
+
+        results = await asyncio.gather(*(update(runner, user_id)
+                                         for user_id in user_ids
+                                         for update in (start_command, message, callback_query) * 3))
+
+        for index, user_id in enumerate(user_ids):
+            user_results = results[index * 9:(index + 1) * 9]
+            assert sum(created for _, created in user_results) == 1
+            assert all(session is runner.user_sessions[user_id] for session, _ in user_results)
+
+        assert started == {user_id: 1 for user_id in user_ids}
+        assert sorted(runner.user_sessions.keys()) == list(user_ids)
+        assert not runner._session_creations
+
+        await stop_sessions(runner)
+
+    asyncio.run(run())
+
+
+def test_waiters_retry_when_session_creation_fails():
+    async def run():
+        started = collections.Counter()
+
+        async def on_started(user_info):
+            started[user_info.user_id] += 1
+            await asyncio.sleep(0.01)
+            if started[user_info.user_id] == 1:
+                raise RuntimeError("creation failed")
+
+        runner = create_runner(on_started)
+
+        results = await asyncio.gather(*(update(runner, 1) for update in (start_command, message, callback_query) * 2),
+                                       return_exceptions=True)
+
+        assert isinstance(results[0], RuntimeError)
+        sessions = results[1:]
+        assert sum(created for _, created in sessions) == 1
+        assert all(session is runner.user_sessions[1] for session, _ in sessions)
+        assert started[1] == 2
+        assert runner.user_sessions.keys() == [1]
+        assert not runner._session_creations
+
+        await stop_sessions(runner)
+
+    asyncio.run(run())
@@ -1,4 +1,5 @@
 import logging
+import pickle
 import time
 import typing as tp
 
@@ -6,11 +7,14 @@ import aiogram
 
 from rtgbot.base import ComponentTreeNode
 from rtgbot.components.navigation_stack import NavigationStack
-from rtgbot.etities.dom import RenderContext
+from rtgbot.etities.dom import RenderContext, DOMMessageUpdate
 from rtgbot.etities.event import Event
+from rtgbot.etities.session_snapshot import SessionSnapshot, message_digest
 from rtgbot.etities.user_info import UserInfo
 from rtgbot.event_processor import EventProcessor
+from rtgbot.input_coalescer import InputCoalescer
 from rtgbot.message_sender import MessageSender
+from rtgbot.render_context_loader import RenderContextLoader
 from rtgbot.renderer import Renderer
 from rtgbot.navigator import Navigator
 
@@ -18,16 +22,18 @@ from rtgbot.navigator import Navigator
 class UserSession:
     def __init__(self, bot: aiogram.Bot,
                  user_info: UserInfo, start_screen, message_sender: MessageSender,
-                 render_context_provider: tp.Callable[[UserInfo], tp.Coroutine] = None,
-                 on_started: tp.Callable[[UserInfo], tp.Coroutine] = None):
+                 render_context_loader: RenderContextLoader = None,
+                 on_started: tp.Callable[[UserInfo], tp.Coroutine] = None,
+                 input_coalescing_window: float = 0.5):
         self.user_info = user_info
-        self.render_context_provider = render_context_provider
+        self.render_context_loader = render_context_loader
         self.on_started = on_started
 
         self.root = NavigationStack()
 
         self.navigator = Navigator(self.root, start_screen)
         self.event_processor = EventProcessor(on_event_processed=self._on_event_processed)
+        self.input_coalescer = InputCoalescer(self.event_processor.push_message_inputs, window=input_coalescing_window)
         self.context = RenderContext(
             bot=bot,
             user_id=user_info.user_id,
@@ -59,6 +65,7 @@ class UserSession:
         self.event_processor.start()
 
     async def stop(self):
+        self.input_coalescer.flush()
         await self.event_processor.stop()
 
     async def schedule_screen_reset(self):
@@ -70,6 +77,85 @@ class UserSession:
     def is_started(self):
         return self._is_started
 
+    def snapshot(self) -> SessionSnapshot:
+        states = {}
+
+        for node in self._iter_rendered_nodes():
+            values = {}
+            for key, value in node.rct._values.items():
+                # props and computed values are restored by rendering
+                if key[0] == '$' or value.watched_expr is not None:
+                    continue
+                try:
+                    pickle.dumps(value.curr)
+                except Exception:
+                    continue
+                values[key] = value.curr
+
+            if values:
+                states[node.rendered_chained_key or ''] = (type(node).__qualname__, values)
+
+        return SessionSnapshot(
+            navigation=self.navigator.snapshot(),
+            states=states,
+            dom=[(message.key, message_digest(message), message.media_content) for message in self.renderer.dom]
+        )
+
+    async def resume(self, snapshot: SessionSnapshot):
+        self.navigator.restore(snapshot.navigation)
+        await self.start(display=False)
+
+        # nodes are created by rendering, so restore states top-down and re-render until no new node matches
+        restored_keys = set()
+        while True:
+            restored_nodes = []
+
+            for node in self._iter_rendered_nodes():
+                key = node.rendered_chained_key or ''
+                if key in restored_keys or key not in snapshot.states:
+                    continue
+                restored_keys.add(key)
+
+                type_name, values = snapshot.states[key]
+                if type_name != type(node).__qualname__:
+                    continue
+
+                for k, v in values.items():
+                    node.rct._set_value(k, v, False)
+                node.rct._reset_state_history()
+                restored_nodes.append(node)
+
+            if not restored_nodes:
+                break
+            await self.renderer.render(restored_nodes)
+
+        dom = self.renderer.dom
+        self.event_processor.register_dom_callbacks(dom)
+
+        # the hibernated screen is still in the chat: edit only the messages whose content differs,
+        # a forced edit resends text and keyboard but not media, so a changed media resets the screen
+        if [(message.key, message.media_content) for message in dom] != [(key, media) for key, _, media in snapshot.dom]:
+            self.message_sender.schedule_screen_reset(self.user_info.user_id, dom)
+            return
+
+        dom_update = []
+        for message, (_, digest, _) in zip(dom, snapshot.dom):
+            action = message_digest(message) == digest and DOMMessageUpdate.Action.keep or DOMMessageUpdate.Action.update
+            dom_update.append(DOMMessageUpdate(action=action, old_message=message, new_message=message))
+
+        # no previous DOM: the messages in the chat are not rendered here, so a task merged into this one resets the screen
+        if any(update.action == DOMMessageUpdate.Action.update for update in dom_update):
+            self.message_sender.schedule_screen_update(self.user_info.user_id, dom, dom_update)
+
+    def _iter_rendered_nodes(self):
+        stack = [self.renderer.component_tree]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            yield node
+            stack.extend(node._render_data.children.values())
+
     def update_user_info(self, user_info: UserInfo):
         self.user_info = user_info
 
@@ -83,18 +169,20 @@ class UserSession:
 
         start = time.time()
 
+        prev_dom = self.renderer.dom
         dom, dom_update = await self.renderer.render(modified_nodes, force_update_node)
         self.event_processor.register_dom_callbacks(dom)
 
         end = time.time()
         logging.info(f"rendering time: {end - start}")
 
-        self.message_sender.schedule_screen_update(self.user_info.user_id, dom, dom_update)
+        self.message_sender.schedule_screen_update(self.user_info.user_id, dom, dom_update,
+                                                   prev_dom, self.renderer.force_update_message_key)
 
     async def _update_render_context(self):
-        if self.render_context_provider:
+        if self.render_context_loader and self.render_context_loader.is_enabled:
             try:
-                data = await self.render_context_provider(self.user_info)
+                data = await self.render_context_loader.load(self.user_info)
                 for k, v in data.items():
                     setattr(self.context, k, v)
             except Exception:
@@ -0,0 +1,111 @@
+import asyncio
+import hmac
+import logging
+import secrets
+import typing as tp
+from dataclasses import dataclass
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+
+@dataclass
+class WebhookConfig:
+    # public url registered with setWebhook, leave empty when the webhook is managed elsewhere
+    url: str = None
+    path: str = '/webhook'
+    host: str = '0.0.0.0'
+    port: int = 8080
+    secret_token: str = None
+    max_concurrency: int = 256
+    drop_pending_updates: bool = False
+
+
+@dataclass
+class WebhookServerStats:
+    received: int = 0
+    rejected: int = 0
+    malformed: int = 0
+    failed: int = 0
+
+
+class WebhookServer:
+    SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+    def __init__(self, bot: Bot, dispatcher: Dispatcher, config: WebhookConfig = None):
+        self.bot = bot
+        self.dispatcher = dispatcher
+        self.config = config or WebhookConfig()
+        self.stats = WebhookServerStats()
+
+        self.secret_token = self.config.secret_token
+        if self.secret_token is None and self.config.url:
+            self.secret_token = secrets.token_urlsafe(32)
+
+        # a saturated server holds the request open, so Telegram backs off instead of losing updates
+        self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        self._tasks: tp.Set[asyncio.Task] = set()
+        self._app_runner: tp.Optional[web.AppRunner] = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(self.config.path, self._handle_update)
+
+        self._app_runner = web.AppRunner(app, access_log=None)
+        await self._app_runner.setup()
+        await web.TCPSite(self._app_runner, self.config.host, self.config.port).start()
+
+        await self.dispatcher.emit_startup(bot=self.bot, dispatcher=self.dispatcher)
+
+        if self.config.url:
+            await self.bot.set_webhook(self.config.url, secret_token=self.secret_token,
+                                       drop_pending_updates=self.config.drop_pending_updates)
+
+    async def stop(self):
+        if self._app_runner is None:
+            return
+
+        if self.config.url:
+            try:
+                await self.bot.delete_webhook()
+            except Exception:
+                logging.exception("Exception while deleting webhook:")
+
+        await self._app_runner.cleanup()
+        self._app_runner = None
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        await self.dispatcher.emit_shutdown(bot=self.bot, dispatcher=self.dispatcher)
+
+    async def _handle_update(self, request: web.Request):
+        if self.secret_token is not None and not hmac.compare_digest(
+                request.headers.get(self.SECRET_TOKEN_HEADER, ''), self.secret_token):
+            self.stats.rejected += 1
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception:
+            self.stats.malformed += 1
+            return web.Response(status=400)
+
+        self.stats.received += 1
+
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._feed_update(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return web.Response()
+
+    async def _feed_update(self, update: Update):
+        try:
+            await self.dispatcher.feed_update(self.bot, update)
+        except Exception:
+            self.stats.failed += 1
+            logging.exception("Exception while processing update:")
+        finally:
+            self._semaphore.release()